@@ -0,0 +1,47 @@
+# MicroPush
+
+from .StringTable import StringTable
+
+
+class ClientSession(object):
+    """
+    Protocol state of one app talking to the script, over MIDI or one
+    network connection: the capabilities it asked for in its hello, the
+    names and palette colors it was sent, and the last payload per full
+    state message so unchanged ones aren't sent to it again. A hello or
+    resync from one app starts its own session over, never another's.
+
+    `send(data, message_id)` delivers a message to that app only.
+    """
+
+    def __init__(self, send, supported_capabilities):
+        self.send = send
+        self.supported_capabilities = supported_capabilities
+        self.capabilities = 0
+        self.string_table = StringTable()
+        self.sent_palette = {}
+        self.pending_palette = []
+        self._last_payloads = {}
+
+    def reset(self, capabilities=0):
+        """ Starts over after a hello, with the requested capabilities this transport supports. """
+        self.capabilities = capabilities & self.supported_capabilities
+        self.string_table.reset()
+        self.sent_palette = {}
+        self.pending_palette = []
+        self._last_payloads = {}
+
+    def changed(self, key, payload):
+        """ Returns False when `payload` is what was last sent for `key`, and remembers it otherwise. """
+        if self._last_payloads.get(key) == payload:
+            return False
+        self._last_payloads[key] = payload
+        return True
+
+    def forget(self, message_ids=None):
+        """ Makes the next payload of these message ids (all if None) go out even when unchanged. """
+        if message_ids is None:
+            self._last_payloads = {}
+            return
+        for key in [key for key in self._last_payloads if key[0] in message_ids]:
+            del self._last_payloads[key]
@@ -0,0 +1,37 @@
+# MicroPush
+
+import Live
+from _Framework.ButtonElement import ButtonElement
+from _Framework.EncoderElement import EncoderElement
+from _Framework.SliderElement import SliderElement
+from _Framework.InputControlElement import MIDI_CC_TYPE
+
+
+class ControlPool(object):
+    """
+    Hands out control elements keyed by (type, channel, CC) and reuses them,
+    so rebuilding the mixer bindings never allocates the same control twice.
+    """
+
+    def __init__(self):
+        self._controls = {}
+
+    def __len__(self):
+        return len(self._controls)
+
+    def slider(self, channel, cc):
+        return self._control('slider', channel, cc, lambda: SliderElement(MIDI_CC_TYPE, channel, cc))
+
+    def encoder(self, channel, cc):
+        return self._control('encoder', channel, cc,
+                             lambda: EncoderElement(MIDI_CC_TYPE, channel, cc, Live.MidiMap.MapMode.absolute))
+
+    def button(self, channel, cc):
+        return self._control('button', channel, cc, lambda: ButtonElement(1, MIDI_CC_TYPE, channel, cc))
+
+    def _control(self, control_type, channel, cc, create):
+        key = (control_type, channel, cc)
+        control = self._controls.get(key)
+        if control is None:
+            control = self._controls[key] = create()
+        return control
@@ -0,0 +1,60 @@
+# MicroPush
+
+from .ListenerRegistry import ListenerRegistry
+
+
+class DeviceChainCache(object):
+    """
+    Devices of a track or rack chain, and chains of a rack, read once and
+    kept with their names and an index per identity. An entry is dropped when
+    the devices or chains of its container change or one of them is renamed,
+    and read again the next time it is asked for. Racks are only looked into
+    when their chains are asked for.
+    """
+
+    def __init__(self, identity, on_invalidate=None):
+        self._identity = identity
+        self._on_invalidate = on_invalidate
+        self._entries = {}
+        self._listeners = ListenerRegistry()
+
+    def devices(self, container):
+        return self._entry(container, 'devices')[0]
+
+    def device_names(self, container):
+        return self._entry(container, 'devices')[1]
+
+    def device_index(self, container, device):
+        return self._entry(container, 'devices')[2].get(self._identity(device))
+
+    def chains(self, rack):
+        return self._entry(rack, 'chains')[0]
+
+    def chain_names(self, rack):
+        return self._entry(rack, 'chains')[1]
+
+    def invalidate(self, key):
+        # runs from Live notifications, the listeners themselves are only
+        # replaced when the entry is read again
+        if self._entries.pop(key, None) is not None and self._on_invalidate is not None:
+            self._on_invalidate(key[0])
+
+    def disconnect(self):
+        self._listeners.disconnect()
+        self._entries = {}
+
+    def _entry(self, container, kind):
+        key = (self._identity(container), kind)
+        entry = self._entries.get(key)
+        if entry is None:
+            for listener_key in self._listeners.keys():
+                if listener_key[:2] == key:
+                    self._listeners.unregister(listener_key)
+            items = tuple(getattr(container, kind))
+            entry = self._entries[key] = (items, [item.name for item in items],
+                                          dict((self._identity(item), index) for index, item in enumerate(items)))
+            invalidate = lambda: self.invalidate(key)
+            self._listeners.register(key + (None, ), container, (kind, ), invalidate)
+            for item in items:
+                self._listeners.register(key + (self._identity(item), ), item, ('name', ), invalidate)
+        return entry
@@ -0,0 +1,101 @@
+# MicroPush
+
+import time
+from contextlib import contextmanager
+
+# timings in a digest or diagnostics report, slowest in total first
+REPORTED_TIMINGS = 16
+
+
+class Diagnostics(object):
+    """
+    Calls, total and longest duration of the script's entry points, and the
+    messages and bytes sent per message id. Entry points are wrapped once when
+    they are registered; while diagnostics are off a wrapper only checks a
+    flag before calling through.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._timings = {}
+        self._traffic = {}
+
+    def reset(self):
+        self._timings = {}
+        self._traffic = {}
+
+    def wrap(self, name, callback):
+
+        def instrumented(*a, **k):
+            if not self.enabled:
+                return callback(*a, **k)
+            start = time.perf_counter()
+            try:
+                return callback(*a, **k)
+            finally:
+                self.record(name, time.perf_counter() - start)
+
+        return instrumented
+
+    @contextmanager
+    def measure(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, duration):
+        timing = self._timings.get(name)
+        if timing is None:
+            timing = self._timings[name] = [0, 0.0, 0.0]
+        timing[0] += 1
+        timing[1] += duration
+        if duration > timing[2]:
+            timing[2] = duration
+
+    def count_message(self, message_id, size):
+        traffic = self._traffic.get(message_id)
+        if traffic is None:
+            traffic = self._traffic[message_id] = [0, 0]
+        traffic[0] += 1
+        traffic[1] += size
+
+    def timings(self, limit=REPORTED_TIMINGS):
+        """ (name, calls, total seconds, longest seconds), slowest in total first. """
+        timings = sorted(((name, ) + tuple(timing) for name, timing in self._timings.items()),
+                         key=lambda timing: timing[2], reverse=True)
+        return timings[:limit]
+
+    def traffic(self):
+        """ (message id, messages, bytes) per message id. """
+        return sorted((message_id, ) + tuple(traffic) for message_id, traffic in self._traffic.items())
+
+    def report(self, counters=()):
+        """
+        Compact ascii summary: timings as name, calls, total and longest in
+        microseconds, then traffic as message id (hex), messages and bytes,
+        then the given (name, value) counters. Sections are separated by "|",
+        entries by "/" and fields by ",".
+        """
+        timings = '/'.join('{},{},{},{}'.format(name, calls, int(total * 1e6), int(longest * 1e6))
+                           for name, calls, total, longest in self.timings())
+        traffic = '/'.join('{:02X},{},{}'.format(message_id, messages, size)
+                           for message_id, messages, size in self.traffic())
+        counters = '/'.join('{},{}'.format(name, value) for name, value in counters)
+        return '|'.join((timings, traffic, counters))
+
+    def digest(self, counters=()):
+        """ Lines for the log, one per timing, then the traffic and the counters. """
+        lines = ['{}: {} calls, {:.2f} ms total, {:.2f} ms max'.format(name, calls, total * 1000.0, longest * 1000.0)
+                 for name, calls, total, longest in self.timings()]
+        traffic = self.traffic()
+        if traffic:
+            lines.append('sent: ' + ', '.join('{:02X} {} msgs {} bytes'.format(message_id, messages, size)
+                                              for message_id, messages, size in traffic))
+        if counters:
+            lines.append('counters: ' + ', '.join('{} {}'.format(name, value) for name, value in counters))
+        return lines
@@ -0,0 +1,35 @@
+# MicroPush
+
+
+class IdentityIndex(object):
+    """
+    Position of every object of a Live list, keyed by identity. The list is
+    only read again on the first lookup after `invalidate`, which the
+    structural listeners (tracks, return tracks, scenes) call.
+    """
+
+    def __init__(self, read_items, identity):
+        self._read_items = read_items
+        self._identity = identity
+        self._indices = None
+        self._count = 0
+
+    def invalidate(self):
+        self._indices = None
+
+    def __len__(self):
+        self._ensure_indices()
+        return self._count
+
+    def index(self, item):
+        """ Returns the position of `item` in the list, or None if it isn't in it. """
+        if item is None:
+            return None
+        self._ensure_indices()
+        return self._indices.get(self._identity(item))
+
+    def _ensure_indices(self):
+        if self._indices is None:
+            items = self._read_items()
+            self._indices = dict((self._identity(item), index) for index, item in enumerate(items))
+            self._count = len(items)
@@ -0,0 +1,35 @@
+# MicroPush
+
+from _Framework.MixerComponent import MixerComponent
+
+
+class LazyMixerComponent(MixerComponent):
+    """
+    MixerComponent that only creates return strips once the set has that
+    many return tracks. Strips are assigned from all tracks, tracks folded
+    away in a group included, so strip n shows the track at offset + n like
+    the clip grid and the track indices the app sends.
+    """
+
+    def __init__(self, num_tracks=0, num_returns=0, max_returns=24, *a, **k):
+        super(LazyMixerComponent, self).__init__(num_tracks, num_returns, *a, **k)
+        self._max_returns = max_returns
+
+    def tracks_to_use(self):
+        return self.song().tracks
+
+    def channel_strip_count(self):
+        return len(self._channel_strips)
+
+    def return_strip_count(self):
+        return len(self._return_strips)
+
+    def ensure_return_strips(self, count):
+        count = min(count, self._max_returns)
+        if count <= len(self._return_strips):
+            return
+        while len(self._return_strips) < count:
+            strip = self._create_strip()
+            self._return_strips.append(strip)
+            self.register_components(strip)
+        self._reassign_tracks()
@@ -0,0 +1,59 @@
+# MicroPush
+
+from ableton.v2.base import liveobj_valid
+
+
+class ListenerRegistry(object):
+    """
+    Keeps track of the Live listeners added per subject, so they can be
+    added and removed incrementally and all torn down in one pass without
+    querying the song again. Subjects are keyed by a caller supplied key,
+    usually the identity of the Live object.
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def keys(self):
+        return list(self._entries.keys())
+
+    def subject(self, key):
+        entries = self._entries.get(key)
+        return entries[0][0] if entries else None
+
+    def register(self, key, subject, events, callback):
+        """ Adds `callback` as listener of every event in `events` on `subject`, unless `key` is already registered. """
+        if key in self._entries:
+            return False
+        entries = []
+        for event in events:
+            getattr(subject, 'add_' + event + '_listener')(callback)
+            entries.append((subject, event, callback))
+        self._entries[key] = entries
+        return True
+
+    def unregister(self, key):
+        for subject, event, callback in self._entries.pop(key, ()):
+            # listeners of deleted objects went away with them
+            if not liveobj_valid(subject):
+                continue
+            remove_listener = getattr(subject, 'remove_' + event + '_listener')
+            if getattr(subject, event + '_has_listener')(callback):
+                remove_listener(callback)
+
+    def sync(self, keys):
+        """ Unregisters every key not in `keys` and returns the keys that still need registering. """
+        keys = set(keys)
+        for key in [key for key in self._entries if key not in keys]:
+            self.unregister(key)
+        return keys.difference(self._entries)
+
+    def disconnect(self):
+        for key in list(self._entries):
+            self.unregister(key)
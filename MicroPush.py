@@ -1,18 +1,33 @@
 # MicroPush
 
 from __future__ import with_statement
+import time
+from contextlib import contextmanager
 import Live
 from _Framework.ControlSurface import ControlSurface
-from _Framework.MixerComponent import MixerComponent
 from _Framework.TransportComponent import TransportComponent
 from _Framework.SessionComponent import SessionComponent
 from _Framework.EncoderElement import *
 from _Framework.ButtonElement import ButtonElement
-from _Framework.SliderElement import SliderElement
 from _Framework.InputControlElement import MIDI_NOTE_TYPE, MIDI_NOTE_ON_STATUS, MIDI_NOTE_OFF_STATUS, MIDI_CC_TYPE
 from _Framework.DeviceComponent import DeviceComponent
 from ableton.v2.base import listens, liveobj_valid, liveobj_changed
-import time, threading
+from .TickScheduler import TickScheduler, TICK_PERIOD
+from .SysexCodec import encode_14bit, decode_14bit, pack_values, encode_clip_grid, encode_clip_delta, \
+    encode_clip_notes, encode_note_diff, NOTE_TIME_RESOLUTION
+from .SysexFramer import SysexFramer, CHUNK_MESSAGE
+from .OutboundBus import OutboundBus, INTERACTIVE, STATE, BULK
+from .ClientSession import ClientSession
+from .ListenerRegistry import ListenerRegistry
+from .ControlPool import ControlPool
+from .StateJournal import StateJournal
+from .DeviceChainCache import DeviceChainCache
+from .RowCache import RowCache
+from .IdentityIndex import IdentityIndex
+from .Diagnostics import Diagnostics
+from .TrafficRecorder import TrafficRecorder, default_recording_path
+from .WebSocketTransport import WebSocketTransport
+from .LazyMixerComponent import LazyMixerComponent
 
 
 mixer, transport, session_component = None, None, None
@@ -20,24 +35,278 @@ quantize_grid_value = 5
 quantize_strength_value = 1.0
 swing_amount_value = 0.0
 
+# clip slot state bits, packed into one nibble per slot
+CLIP_HAS_CLIP = 0x08
+CLIP_IS_PLAYING = 0x04
+CLIP_IS_RECORDING = 0x02
+CLIP_IS_TRIGGERED = 0x01
+
+# version of the sysex protocol, exchanged in the hello handshake
+PROTOCOL_VERSION = 1
+
+# capabilities the app can opt into during the handshake
+CAPABILITY_BINARY_CLIP_GRID = 0x01
+CAPABILITY_CHUNKED = 0x02
+CAPABILITY_CHUNK_ACK = 0x04
+CAPABILITY_STRING_TABLE = 0x08
+CAPABILITY_PARAMETER_VALUES = 0x10
+CAPABILITY_STATE_VERSIONS = 0x20
+SUPPORTED_CAPABILITIES = (CAPABILITY_BINARY_CLIP_GRID | CAPABILITY_CHUNKED | CAPABILITY_CHUNK_ACK |
+                          CAPABILITY_STRING_TABLE | CAPABILITY_PARAMETER_VALUES | CAPABILITY_STATE_VERSIONS)
+# what an app on the network can opt into: whole messages arrive in order, so
+# there is nothing to chunk, and the state journal follows the MIDI app
+NETWORK_CAPABILITIES = SUPPORTED_CAPABILITIES & ~(CAPABILITY_CHUNKED | CAPABILITY_CHUNK_ACK |
+                                                  CAPABILITY_STATE_VERSIONS)
+
+# outgoing sysex message ids
+SLOT_DELTA_MESSAGE = 0x11
+HELLO_MESSAGE = 0x12
+BINARY_CLIP_GRID_MESSAGE = 0x13
+BINARY_SLOT_DELTA_MESSAGE = 0x14
+# 0x15 is the chunk frame, see SysexFramer
+STRING_DEFINITION_MESSAGE = 0x16
+PALETTE_MESSAGE = 0x17
+TRACK_TABLE_MESSAGE = 0x18
+TRACK_UPDATE_MESSAGE = 0x19
+SESSION_RING_MESSAGE = 0x1A
+PLAYBACK_PROGRESS_MESSAGE = 0x1B
+METER_MESSAGE = 0x1C
+BATCH_RESULT_MESSAGE = 0x1D
+STATE_VERSION_MESSAGE = 0x1E
+PARAMETER_VALUE_MESSAGE = 0x1F
+DEVICE_CHAINS_MESSAGE = 0x20
+DIAGNOSTICS_MESSAGE = 0x21
+CLIP_NOTES_MESSAGE = 0x22
+CLIP_NOTE_DIFF_MESSAGE = 0x23
+SCENE_METADATA_MESSAGE = 0x24
+CLIP_METADATA_MESSAGE = 0x25
+
+# messages describing state, journaled so a reconnecting app can catch up
+JOURNALED_MESSAGES = frozenset((
+    0x01, 0x02, 0x03, 0x04, 0x05, 0x06, 0x07, 0x08, 0x10, 0x4D, 0x5D, 0x6D, 0x7D,
+    SLOT_DELTA_MESSAGE, BINARY_CLIP_GRID_MESSAGE, BINARY_SLOT_DELTA_MESSAGE, STRING_DEFINITION_MESSAGE,
+    PALETTE_MESSAGE, TRACK_TABLE_MESSAGE, TRACK_UPDATE_MESSAGE, SESSION_RING_MESSAGE))
+
+# priority on the outbound bus, messages not listed are state deltas; query
+# answers that can run into kilobytes (diagnostics, scene and clip metadata)
+# stay within the byte budget like them
+MESSAGE_PRIORITIES = {
+    0x01: INTERACTIVE, 0x03: INTERACTIVE, 0x08: INTERACTIVE, 0x10: INTERACTIVE, 0x4D: INTERACTIVE,
+    0x5D: INTERACTIVE, 0x6D: INTERACTIVE, 0x7D: INTERACTIVE, HELLO_MESSAGE: INTERACTIVE,
+    BATCH_RESULT_MESSAGE: INTERACTIVE, PARAMETER_VALUE_MESSAGE: INTERACTIVE, DEVICE_CHAINS_MESSAGE: INTERACTIVE,
+    0x02: BULK, 0x04: BULK, 0x05: BULK, 0x06: BULK, 0x07: BULK, BINARY_CLIP_GRID_MESSAGE: BULK,
+    TRACK_TABLE_MESSAGE: BULK, CHUNK_MESSAGE: BULK,
+}
+
+# messages carrying a complete piece of state, dropped when they didn't change since the last time
+DEDUPLICATED_MESSAGES = frozenset((
+    0x01, 0x02, 0x03, 0x04, 0x05, 0x06, 0x07, 0x08, 0x10, 0x4D, 0x5D, 0x6D, 0x7D,
+    BINARY_CLIP_GRID_MESSAGE, TRACK_TABLE_MESSAGE, SESSION_RING_MESSAGE))
+
+# deltas after which the last full message of that state is outdated
+DEDUPLICATION_RESET_BY = {
+    SLOT_DELTA_MESSAGE: (0x05, BINARY_CLIP_GRID_MESSAGE),
+    BINARY_SLOT_DELTA_MESSAGE: (0x05, BINARY_CLIP_GRID_MESSAGE),
+    TRACK_UPDATE_MESSAGE: (TRACK_TABLE_MESSAGE, ),
+}
+
+# diagnostics are off until the app turns them on
+DIAGNOSTICS_ENABLED = False
+
+# where traffic recordings are written, the home directory if None
+RECORDING_DIRECTORY = None
+# display ticks between two writes of the recorded traffic
+RECORDING_FLUSH_INTERVAL = 10
+
+# port of the WebSocket server for apps on the local network, None for no
+# server; the interface it listens on, only this computer unless set to an
+# address of the network ('' for all of them); the token clients have to pass
+# as ?token= in the URL, None to accept any client that can connect; clients
+# connected at the same time, and bytes queued for one client before it is
+# dropped as too slow
+NETWORK_PORT = None
+NETWORK_HOST = '127.0.0.1'
+NETWORK_TOKEN = None
+NETWORK_MAX_CLIENTS = 4
+NETWORK_QUEUE_BYTES = 1 << 20
+
+# track tables sent with TRACK_TABLE_MESSAGE
+TRACK_TABLE_TRACKS = 0
+TRACK_TABLE_RETURNS = 1
+
+# properties in a TRACK_UPDATE_MESSAGE, by listener name
+TRACK_PROPERTIES = {'name': 0, 'color': 1, 'mute': 2, 'solo': 3, 'arm': 4}
+
+# incoming sysex command ids
+RESYNC_COMMAND = 0x0C
+HELLO_COMMAND = 0x0D
+CHUNK_ACK_COMMAND = 0x0E
+CHUNK_RESEND_COMMAND = 0x0F
+SET_SESSION_RING_COMMAND = 0x10
+PLAYBACK_PROGRESS_COMMAND = 0x11
+METER_COMMAND = 0x12
+BATCH_COMMAND = 0x13
+RESYNC_SINCE_COMMAND = 0x14
+DEVICE_CHAINS_COMMAND = 0x15
+DIAGNOSTICS_COMMAND = 0x16
+RECORD_COMMAND = 0x17
+CLIP_NOTES_COMMAND = 0x18
+SCENE_METADATA_COMMAND = 0x19
+CLIP_METADATA_COMMAND = 0x1A
+FIRE_CLIP_COMMAND = 0x09
+DELETE_CLIP_COMMAND = 0x0A
+COPY_CLIP_COMMAND = 0x0B
+
+# selection CCs on channel 1, collapsed to their last value and applied once
+# per display tick, in the order of their slot: track and return track selection
+# share one so the later of the two wins, and the track is selected before its
+# device (CC 3) and clip slot (CC 15)
+SELECTION_CONTROLS = {4: 0, 5: 0, 3: 1, 15: 2}
+
+# notes per clip notes or note diff message; a dump of a dense detail clip
+# is sent one page per display tick
+CLIP_NOTES_PER_PAGE = 256
+
+# rows in one answer to a scene or clip metadata query, and fetched rows kept
+# up to date before the least recently fetched are forgotten
+METADATA_PAGE_LIMIT = 64
+METADATA_ROW_LIMIT = 512
+
+# display ticks between two parameter value messages, whatever automation does
+PARAMETER_VALUE_INTERVAL = 1
+
+# meter changes smaller than this (out of 127) are not sent, except for falling silent
+METER_HYSTERESIS = 2
+
+# tracks and scenes observed around the session ring so short scrolls
+# don't have to wait for the next grid
+RING_TRACK_MARGIN = 2
+RING_SCENE_MARGIN = 4
+
+# display ticks between two checks of the session ring's clip slots against the
+# states sent, in case a clip slot notification was missed
+CLIP_SLOT_CHECK_INTERVAL = 30
+
+
+def _live_id(live_object):
+    # stable identity of the Live object behind a python wrapper
+    return getattr(live_object, '_live_ptr', id(live_object))
+
 
 
 class MicroPush(ControlSurface):
 
     def __init__(self, c_instance):
         ControlSurface.__init__(self, c_instance)
+        # timings and traffic of the entry points, wrapped as they are registered
+        self._diagnostics = Diagnostics(DIAGNOSTICS_ENABLED)
+        # inbound and outbound traffic, recorded while the app asks for it
+        self._recorder = TrafficRecorder(log_message=self.log_message)
         with self.component_guard():
             global mixer
             global transport
             global session_component
             track_count = 8
-            return_count = 24  # Maximum of 12 Sends and 12 Returns
-            mixer = MixerComponent(track_count, return_count)
+            # return strips are added as the set gets return tracks, up to
+            # a maximum of 24 (12 Sends and 12 Returns)
+            mixer = LazyMixerComponent(track_count, len(self.song().return_tracks), max_returns=24)
+            # controls are reused across mixer updates, strips only get
+            # rebound when the track they show changed
+            self._control_pool = ControlPool()
+            self._bound_strip_tracks = {}
+            # positions of tracks, return tracks and scenes, read again after structural changes only
+            self._track_indices = IdentityIndex(lambda: self.song().tracks, _live_id)
+            self._return_track_indices = IdentityIndex(lambda: self.song().return_tracks, _live_id)
+            self._scene_indices = IdentityIndex(lambda: self.song().scenes, _live_id)
+            # the track the script armed, the only one to disarm on the next selection
+            self._implicitly_armed_track = None
             transport = TransportComponent()
             session_component = SessionComponent()
             # set up undo redo
             self._last_can_redo = self.song().can_redo
             self._last_can_undo = self.song().can_undo
+            # last clip slot states sent to the app, one list per track
+            self._clip_slot_states = []
+            # track and scene index of the first slot in _clip_slot_states
+            self._clip_grid_origin = (0, 0)
+            # window of the session the app shows, the whole song until the app sets one
+            self._ring_active = False
+            self._ring_track_offset = 0
+            self._ring_scene_offset = 0
+            self._ring_width = 0
+            self._ring_height = 0
+            # has_clip/is_triggered listeners keyed by (track, scene) identity, and the
+            # tracks and scenes of the observed area they were registered for
+            self._clip_slot_listeners = ListenerRegistry()
+            self._observed_track_ids = set()
+            self._observed_scene_ids = set()
+            # everything sent to the MIDI app goes through the bus, by priority and within a byte budget
+            self._bus = OutboundBus(self._send_counted_midi)
+            # large payloads are streamed in chunks once the app asked for it
+            self._framer = SysexFramer(self._send_sys_ex_frame)
+            # protocol state of the MIDI app and of every app on the network, ascii formats
+            # until their hello; messages go to all of them unless they answer one command
+            self._midi_session = ClientSession(self._send_midi_data, SUPPORTED_CAPABILITIES)
+            self._sessions = [self._midi_session]
+            self._audience = None
+            # the session of the app whose command is being handled
+            self._command_session = None
+            self._duplicates_dropped = 0
+            # WebSocket server for apps on the network, and the session of each of its clients
+            self._network = None
+            self._network_sessions = {}
+            # versioned journal of the state messages, and the last version announced to the app
+            self._journal = StateJournal()
+            self._announced_version = 0
+            # name, color, mute, solo and arm listeners per track, keyed by (track, property)
+            self._track_listeners = ListenerRegistry()
+            self._dirty_track_properties = {}
+            # clip slot listener per track, keyed by track identity
+            self._clip_slot_callbacks = {}
+            # tracks whose clip slots changed since the last flush
+            self._dirty_clip_tracks = set()
+            # the first tick sends the whole grid, listeners keep it current after that
+            self._clip_grid_dirty = True
+            # last quantized playing position sent per (track, scene)
+            self._playback_positions = {}
+            # metered tracks, and last (left, right) level sent per (table, index)
+            self._meter_first_track = 0
+            self._meter_track_count = 0
+            self._meter_returns = False
+            self._meter_levels = {}
+            # value listeners on the parameters mapped to the 8 encoders, keyed by
+            # (encoder, parameter), and the last 14 bit value sent per encoder
+            self._parameter_listeners = ListenerRegistry()
+            self._parameter_values = {}
+            self._dirty_parameters = set()
+            # device names and indices per track and rack chain, and whether the
+            # devices of the selected track changed since they were last sent
+            self._device_chains = DeviceChainCache(_live_id, self._on_device_chain_changed)
+            self._device_chain_dirty = False
+            # detail clip notes streamed to the app: the observed clip, its notes by id as
+            # last sent, the pages of a dump still to send and the generation of that dump
+            self._notes_streaming = False
+            self._notes_clip = None
+            self._sent_notes = {}
+            self._pending_note_pages = []
+            self._note_page_count = 0
+            self._notes_generation = 0
+            self._notes_clip_changed = False
+            self._notes_dirty = False
+            self._detail_clip_listener = self._diagnostics.wrap('listener detail_clip', self._on_detail_clip_changed)
+            self._clip_notes_listener = self._diagnostics.wrap('listener notes', self._on_clip_notes_changed)
+            # scene and clip names and colors the app fetched, keyed by (message id, position),
+            # and the fetched rows that changed since, sent again on the next tick
+            self._metadata_rows = RowCache(self._on_metadata_row_changed, METADATA_ROW_LIMIT)
+            self._dirty_metadata_rows = set()
+            self._clip_flush_stats = {'flushes': 0, 'callbacks': 0, 'pending': 0,
+                                      'last_coalesced': 0, 'max_coalesced': 0}
+            # value listeners added to buttons, removed again on disconnect
+            self._button_listeners = []
+            # last (callback, value) per selection slot since the last display tick
+            self._pending_selections = {}
+            self._coalesced_selections = 0
+            self._scheduler = TickScheduler(log_message=self.log_message, diagnostics=self._diagnostics)
             self._setup_undo_redo()
             self._initialize_buttons()
             self._update_mixer_and_tracks()
@@ -46,11 +315,20 @@ class MicroPush(ControlSurface):
             self._on_selected_track_changed.subject = self.song().view
             # track = self.song().view.selected_track
             # track.view.add_selected_device_listener(self._on_selected_device_changed)
-            self.song().add_tracks_listener(self._on_tracks_changed)  # hier für return tracks: .add_return_tracks_listener()
+            self._song_listeners = (
+                ('tracks', self._diagnostics.wrap('listener tracks', self._on_tracks_changed)),
+                ('return_tracks', self._diagnostics.wrap('listener return_tracks', self._on_return_tracks_changed)),
+                ('scenes', self._diagnostics.wrap('listener scenes', self._on_scenes_changed)),
+            )
+            for event, callback in self._song_listeners:
+                getattr(self.song(), 'add_' + event + '_listener')(callback)
+            self._register_track_listeners()
             # self.song().view.add_selected_scene_listener(self._on_selected_scene_changed)
             self._setup_device_control()
             self._register_clip_listeners()
-            self._periodic_execution()
+            self._setup_sysex_handlers()
+            self._setup_periodic_tasks()
+            self._start_network()
 
 
     # def _on_selected_device_changed(self):
@@ -71,75 +349,273 @@ class MicroPush(ControlSurface):
         self._on_device_changed.subject = self._device
         self.set_device_component(self._device)
         # Register button listeners for navigation buttons
-        nav_left_button.add_value_listener(self._on_nav_button_pressed)
-        nav_right_button.add_value_listener(self._on_nav_button_pressed)
+        self._add_button_listener(nav_left_button, self._on_nav_button_pressed)
+        self._add_button_listener(nav_right_button, self._on_nav_button_pressed)
 
 
 
     def _on_nav_button_pressed(self, value):
-        if value:
-            self._on_device_changed()
+        # the device stays the same, only the bank changed
+        if value and liveobj_valid(self._device):
+            self._send_bank_name()
+            self._send_bank_parameters()
 
     @subject_slot('device')
     def _on_device_changed(self):
+        with self._diagnostics.measure('listener device'):
+            self._device_changed()
+
+    def _device_changed(self):
         if liveobj_valid(self._device):
-            device = self._device.device()  # Retrieve the Device object
-            # get and send name of bank and device
-            selected_track = self.song().view.selected_track
-            selected_device = selected_track.view.selected_device
-            # device_name = selected_device.name
-            available_devices = selected_track.devices
-            # find index of device
-            selected_device_index = self._find_device_index(selected_device, available_devices)
-            # self.log_message("Selected Device Index: {}".format(selected_device_index))
-            # bank names etc.
-            bank_name = self._device._bank_name
+            self._send_bank_name()
             bank_names_list = ','.join(str(name) for name in self._device._parameter_bank_names())
-            # sending sysex of bank name, device name, bank names
-            self._send_sys_ex_message(bank_name, 0x6D)
             self._send_sys_ex_message(bank_names_list, 0x5D)
-            # sending the index instead of name for device.
-            self._send_sys_ex_message(selected_device_index, 0x4D)
-            # Get all available devices of the selected track
-            available_devices = [device.name for device in selected_track.devices]
-            available_devices_string = ','.join(available_devices)
-            # self.log_message("devices: {}".format(available_devices))
-            self._send_sys_ex_message(available_devices_string, 0x01)
-
-            if hasattr(device, 'parameters') and device.parameters:
-                # TODO: make this prettier!
-                parameter_names = [control.mapped_parameter().name if control.mapped_parameter() else ""
-                                for control in self._device._parameter_controls]
-                parameter_names = [name for name in parameter_names if name]  # Remove empty names
-                if parameter_names:
-                    # self.log_message("Parameter Names: {}".format(parameter_names))
-                    # send a MIDI SysEx message with the names
-                    self._send_parameter_names(parameter_names)
-                else:
-                    self.log_message("No parameter names found in the device controls.")
-            else:
-                self.log_message("Device has no parameters.")
+            self._send_device_chain()
+            self._send_bank_parameters()
         else:
             self.log_message("Invalid device.")
 
-    def _find_device_index(self, device, device_list):
-        for index, d in enumerate(device_list):
-            if device == d:
-                return str(index)
-        return "not found"  # Device not found
+    def _send_bank_name(self):
+        self._send_sys_ex_message(self._device._bank_name, 0x6D)
+
+    def _send_device_chain(self):
+        # sending the index instead of name for device, then all devices of the selected track
+        selected_track = self.song().view.selected_track
+        selected_device_index = self._device_chains.device_index(selected_track, selected_track.view.selected_device)
+        self._send_sys_ex_message(str(selected_device_index) if selected_device_index is not None else "not found",
+                                  0x4D)
+        self._send_sys_ex_message(','.join(self._device_chains.device_names(selected_track)), 0x01)
+        self._device_chain_dirty = False
+
+    def _on_device_chain_changed(self, container_id):
+        if container_id == _live_id(self.song().view.selected_track):
+            self._device_chain_dirty = True
+
+    def _flush_device_chain(self):
+        if self._device_chain_dirty:
+            self._send_device_chain()
+
+    def _send_bank_parameters(self):
+        device = self._device.device()
+        if hasattr(device, 'parameters') and device.parameters:
+            # TODO: make this prettier!
+            parameter_names = [control.mapped_parameter().name if control.mapped_parameter() else ""
+                            for control in self._device._parameter_controls]
+            parameter_names = [name for name in parameter_names if name]  # Remove empty names
+            if parameter_names:
+                # self.log_message("Parameter Names: {}".format(parameter_names))
+                # send a MIDI SysEx message with the names
+                self._send_parameter_names(parameter_names)
+            else:
+                self.log_message("No parameter names found in the device controls.")
+        else:
+            self.log_message("Device has no parameters.")
+        # a new device or bank maps other parameters, their values are all sent again
+        self._parameter_values = {}
+        self._sync_parameter_listeners()
+        self._dirty_parameters.update(key[0] for key in self._parameter_listeners.keys())
+
+    def _send_device_chains(self, path):
+        """
+        Chains of the rack at `path` on the selected track: device index, then
+        chain index and device index for every level of nesting. Racks are only
+        read when the app asks for them like this.
+        """
+        if len(path) % 2 == 0:
+            return
+        devices = self._device_chains.devices(self.song().view.selected_track)
+        rack = None
+        for level, index in enumerate(path):
+            if level % 2 == 0:
+                if index >= len(devices):
+                    return
+                rack = devices[index]
+            else:
+                if not getattr(rack, 'can_have_chains', False):
+                    return
+                chains = self._device_chains.chains(rack)
+                if index >= len(chains):
+                    return
+                devices = self._device_chains.devices(chains[index])
+        if not getattr(rack, 'can_have_chains', False):
+            return
+        chains = self._device_chains.chains(rack)
+        chain_names = self._device_chains.chain_names(rack)
+        chains_string = '/'.join(name + ':' + ','.join(self._device_chains.device_names(chain))
+                                 for name, chain in zip(chain_names, chains))
+        payload = bytearray((len(path), ))
+        for index in path:
+            payload.extend(encode_14bit(index))
+        payload.extend(chains_string.encode('ascii', 'replace'))
+        self._send_sys_ex_message(payload, DEVICE_CHAINS_MESSAGE)
+
+    def _mapped_parameters(self):
+        for index, control in enumerate(self._device._parameter_controls):
+            parameter = control.mapped_parameter()
+            if liveobj_valid(parameter):
+                yield index, parameter
+
+    def _sync_parameter_listeners(self):
+        # also runs every flush, so banks switched from within Live are picked up as well
+        if not any(session.capabilities & CAPABILITY_PARAMETER_VALUES for session in self._sessions):
+            self._parameter_listeners.disconnect()
+            return
+        parameters = dict(((index, _live_id(parameter)), parameter) for index, parameter in self._mapped_parameters())
+        for key in self._parameter_listeners.sync(parameters):
+            index = key[0]
+            callback = self._diagnostics.wrap('listener parameter value',
+                                              lambda index=index: self._dirty_parameters.add(index))
+            self._parameter_listeners.register(key, parameters[key], ('value',), callback)
+            self._parameter_values.pop(index, None)
+            self._dirty_parameters.add(index)
+
+    def _flush_parameter_values(self):
+        # listeners only mark encoders dirty, so a parameter automated at audio rate
+        # still costs one message per interval, and only for values that moved
+        self._sync_parameter_listeners()
+        if not self._dirty_parameters:
+            return
+        dirty = self._dirty_parameters
+        self._dirty_parameters = set()
+        changes = []
+        for key in self._parameter_listeners.keys():
+            index = key[0]
+            if index not in dirty:
+                continue
+            value = self._normalized_parameter_value(self._parameter_listeners.subject(key))
+            if self._parameter_values.get(index) != value:
+                self._parameter_values[index] = value
+                changes.append((index, value))
+        if changes:
+            payload = bytearray((len(changes), ))
+            for index, value in sorted(changes):
+                payload.append(index)
+                payload.extend(encode_14bit(value))
+            self._send_sys_ex_message(payload, PARAMETER_VALUE_MESSAGE,
+                                      self._split_targets(CAPABILITY_PARAMETER_VALUES)[0])
+
+    def _normalized_parameter_value(self, parameter):
+        value_range = parameter.max - parameter.min
+        if value_range <= 0:
+            return 0
+        position = (parameter.value - parameter.min) / float(value_range)
+        return int(round(min(1.0, max(0.0, position)) * 0x3FFF))
 
     def _send_parameter_names(self, parameter_names):
         name_string = ','.join(parameter_names)
         self._send_sys_ex_message(name_string, 0x7D)
 
-    def _send_sys_ex_message(self, name_string, manufacturer_id):
-        status_byte = 0xF0  # SysEx message start
+    def _send_sys_ex_message(self, name_string, manufacturer_id, sessions=None):
         # parameter names: 0x7D, bank name: 0x6D
-        device_id = 0x01  
-        data = name_string.encode('ascii')
+        # binary payloads are passed in as 7-bit safe bytes already, text
+        # is sent as ascii with a "?" for anything outside of it
+        start = time.perf_counter() if self._diagnostics.enabled else None
+        data = name_string.encode('ascii', 'replace') if isinstance(name_string, str) else name_string
+        key = self._message_key(data, manufacturer_id)
+        for session in list(self._targets() if sessions is None else sessions):
+            # duplicates are dropped before they get a state version
+            if manufacturer_id in DEDUPLICATED_MESSAGES and not session.changed(key, bytes(data)):
+                self._duplicates_dropped += 1
+                continue
+            if session is self._midi_session and manufacturer_id in JOURNALED_MESSAGES:
+                self._journal.record(manufacturer_id, data)
+            self._send_sys_ex_data(session, data, manufacturer_id)
+        if start is not None:
+            self._diagnostics.record('send {:02X}'.format(manufacturer_id), time.perf_counter() - start)
+
+    def _message_key(self, data, manufacturer_id):
+        # track tables are one message per table, everything else one per message id
+        return (manufacturer_id, data[0] if manufacturer_id == TRACK_TABLE_MESSAGE else None)
+
+    def _targets(self):
+        return self._sessions if self._audience is None else self._audience
+
+    def _split_targets(self, capability):
+        # sessions the next message goes to that opted into the capability, and the others
+        targets = self._targets()
+        return ([session for session in targets if session.capabilities & capability],
+                [session for session in targets if not session.capabilities & capability])
+
+    @contextmanager
+    def _sending_to(self, sessions):
+        # messages sent meanwhile only go to these sessions, like the answer to a command
+        audience = self._audience
+        self._audience = sessions
+        try:
+            yield
+        finally:
+            self._audience = audience
+
+    def _send_sys_ex_data(self, session, data, manufacturer_id):
+        if manufacturer_id in DEDUPLICATION_RESET_BY:
+            session.forget(DEDUPLICATION_RESET_BY[manufacturer_id])
+        session.send(data, manufacturer_id)
+
+    def _send_midi_data(self, data, manufacturer_id):
+        key = self._message_key(data, manufacturer_id)
+        priority = MESSAGE_PRIORITIES.get(manufacturer_id, STATE)
+        if self._midi_session.capabilities & CAPABILITY_CHUNKED \
+                and self._framer.should_frame(len(data), ordered=priority != INTERACTIVE):
+            replaceable = priority == BULK
+            self._framer.send(manufacturer_id, data, key if replaceable else None)
+        else:
+            self._send_sys_ex_frame(data, manufacturer_id, key)
+
+    def _send_sys_ex_frame(self, data, manufacturer_id, key=None):
+        status_byte = 0xF0  # SysEx message start
+        device_id = 0x01
         end_byte = 0xF7  # SysEx message end
         sys_ex_message = (status_byte, manufacturer_id, device_id) + tuple(data) + (end_byte, )
-        self._send_midi(sys_ex_message)
+        self._bus.send(sys_ex_message, MESSAGE_PRIORITIES.get(manufacturer_id, STATE), key)
+
+    def _send_counted_midi(self, midi_bytes):
+        if self._diagnostics.enabled:
+            # sysex counted by message id, everything else by status
+            message_id = midi_bytes[1] if midi_bytes[0] == 0xF0 else midi_bytes[0] & 0xF0
+            self._diagnostics.count_message(message_id, len(midi_bytes))
+        if self._recorder.recording:
+            self._recorder.record_outbound(midi_bytes)
+        self._send_midi(midi_bytes)
+
+    def _send_network_message(self, client, data, manufacturer_id):
+        # whole messages in order, neither chunks nor a MIDI byte budget needed
+        if self._diagnostics.enabled:
+            self._diagnostics.count_message(manufacturer_id, len(data) + 1)
+        if self._recorder.recording:
+            self._recorder.record_outbound((0xF0, manufacturer_id, 0x01) + tuple(data) + (0xF7, ))
+        self._network.send(client, manufacturer_id, data)
+
+    def _start_network(self):
+        if NETWORK_PORT is None:
+            return
+        network = WebSocketTransport(NETWORK_PORT, host=NETWORK_HOST, token=NETWORK_TOKEN,
+                                     max_clients=NETWORK_MAX_CLIENTS, max_queued_bytes=NETWORK_QUEUE_BYTES,
+                                     on_open=self._on_network_client_open, on_close=self._on_network_client_close,
+                                     log_message=self.log_message)
+        try:
+            network.start()
+        except (IOError, OSError) as error:
+            self.log_message("Could not listen on port {}: {}".format(NETWORK_PORT, error))
+            return
+        self._network = network
+        self.log_message("Listening for apps on {}:{}".format(NETWORK_HOST or '*', network.port))
+
+    def _on_network_client_open(self, client):
+        send = lambda data, manufacturer_id: self._send_network_message(client, data, manufacturer_id)
+        session = ClientSession(send, NETWORK_CAPABILITIES)
+        self._network_sessions[client] = session
+        self._sessions.append(session)
+
+    def _on_network_client_close(self, client):
+        session = self._network_sessions.pop(client, None)
+        if session is not None:
+            self._sessions.remove(session)
+
+    def _on_network_message(self, client, message):
+        # command id and values, handled like the same command sent as sysex, for that client
+        session = self._network_sessions.get(client)
+        if session is not None:
+            self._handle_command((0xF0, ) + tuple(message) + (0xF7, ), session)
 
     def _initialize_buttons(self):
         transport.set_play_button(ButtonElement(1, MIDI_CC_TYPE, 0, 118))
@@ -147,107 +623,151 @@ class MicroPush(ControlSurface):
         transport.set_metronome_button(ButtonElement(1, MIDI_CC_TYPE, 0, 58))
         session_component.set_stop_all_clips_button(ButtonElement(1, MIDI_NOTE_TYPE, 15, 96))
         capture_button = ButtonElement(True, MIDI_NOTE_TYPE, 15, 100)
-        capture_button.add_value_listener(self._capture_button_value)
+        self._add_button_listener(capture_button, self._capture_button_value)
         quantize_button = ButtonElement(True, MIDI_NOTE_TYPE, 15, 99)
-        quantize_button.add_value_listener(self._quantize_button_value)
+        self._add_button_listener(quantize_button, self._quantize_button_value)
         # duplicate the active clip to a free slot
         duplicate_button = ButtonElement(True, MIDI_NOTE_TYPE, 15, 98)
-        duplicate_button.add_value_listener(self._duplicate_button_value)
+        self._add_button_listener(duplicate_button, self._duplicate_button_value)
         # duplicate scene
         duplicate_scene_button = ButtonElement(True, MIDI_NOTE_TYPE, 15, 95)
-        duplicate_scene_button.add_value_listener(self._duplicate_scene_button_value)
+        self._add_button_listener(duplicate_scene_button, self._duplicate_scene_button_value)
         # a session recording button
         sesh_record_button = ButtonElement(1, MIDI_CC_TYPE, 0, 119)
-        sesh_record_button.add_value_listener(self._sesh_record_value)
+        self._add_button_listener(sesh_record_button, self._sesh_record_value)
         # quantize grid size button
         quantize_grid_button = ButtonElement(1, MIDI_CC_TYPE, 1, 0)
-        quantize_grid_button.add_value_listener(self._quantize_grid_value)
+        self._add_button_listener(quantize_grid_button, self._quantize_grid_value)
         # quantize strength
         quantize_strength_button = ButtonElement(1, MIDI_CC_TYPE, 1, 1)
-        quantize_strength_button.add_value_listener(self._quantize_strength_value)
+        self._add_button_listener(quantize_strength_button, self._quantize_strength_value)
         # swing percentage button
         swing_amount_button = ButtonElement(1, MIDI_CC_TYPE, 1, 2)
-        swing_amount_button.add_value_listener(self._swing_amount_value)
+        self._add_button_listener(swing_amount_button, self._swing_amount_value)
         # # periodic check
         # periodic_check_button = ButtonElement(1, MIDI_NOTE_TYPE, 15, 97)
         # periodic_check_button.add_value_listener(self._periodic_check)
         # redo button
         redo_button = ButtonElement(1, MIDI_NOTE_TYPE, 15, 102)
-        redo_button.add_value_listener(self._redo_button_value)
+        self._add_button_listener(redo_button, self._redo_button_value)
         # undo button
         undo_button = ButtonElement(1, MIDI_NOTE_TYPE, 15, 101)
-        undo_button.add_value_listener(self._undo_button_value)
+        self._add_button_listener(undo_button, self._undo_button_value)
         # device selection
         device_selection_button = ButtonElement(1, MIDI_CC_TYPE, 1, 3)
-        device_selection_button.add_value_listener(self._select_device_by_index)
+        self._add_button_listener(device_selection_button, self._select_device_by_index)
         # track selection
         track_selection_button = ButtonElement(1, MIDI_CC_TYPE, 1, 4)
-        track_selection_button.add_value_listener(self._select_track_by_index)
+        self._add_button_listener(track_selection_button, self._select_track_by_index)
         # return and master track selection
         return_track_selection_button = ButtonElement(1, MIDI_CC_TYPE, 1, 5)
-        return_track_selection_button.add_value_listener(self._select_return_track_by_index)
+        self._add_button_listener(return_track_selection_button, self._select_return_track_by_index)
         # scene launch
         scene_launch_button = ButtonElement(1, MIDI_CC_TYPE, 1, 14)
-        scene_launch_button.add_value_listener(self._fire_scene)
+        self._add_button_listener(scene_launch_button, self._fire_scene)
         # clip / scene select
         clip_scene_select_button = ButtonElement(1, MIDI_CC_TYPE, 1, 15)
-        clip_scene_select_button.add_value_listener(self._select_clip_scene)
+        self._add_button_listener(clip_scene_select_button, self._select_clip_scene)
         # scene delete
         scene_delete_button = ButtonElement(1, MIDI_CC_TYPE, 1, 16)
-        scene_delete_button.add_value_listener(self._delete_scene)
+        self._add_button_listener(scene_delete_button, self._delete_scene)
+
+    def _add_button_listener(self, button, callback):
+        instrumented = self._diagnostics.wrap('button ' + callback.__name__.strip('_'), callback)
+        control = (button.message_type(), button.message_channel(), button.message_identifier())
+        selection = SELECTION_CONTROLS.get(control[2]) if control[:2] == (MIDI_CC_TYPE, 1) else None
+
+        def listener(value):
+            if self._recorder.recording:
+                self._recorder.record_control(control[0], control[1], control[2], value)
+            if selection is None:
+                # other controls act on the selection, so it has to be current first
+                if self._pending_selections:
+                    self._apply_pending_selections()
+                instrumented(value)
+                return
+            if selection in self._pending_selections:
+                self._coalesced_selections += 1
+            self._pending_selections[selection] = (instrumented, value)
+
+        button.add_value_listener(listener)
+        self._button_listeners.append((button, listener))
+
+    def _apply_pending_selections(self):
+        pending = self._pending_selections
+        self._pending_selections = {}
+        for selection in sorted(pending):
+            callback, value = pending[selection]
+            callback(value)
 
     def _setup_undo_redo(self):
         can_redo = self.song().can_redo
         can_undo = self.song().can_undo
         if can_redo:
             midi_event_bytes = (0x90 | 0x02, 0x02, 0x64)
-            self._send_midi(midi_event_bytes)
+            self._bus.send(midi_event_bytes, INTERACTIVE)
         if can_undo:
             midi_event_bytes = (0x80 | 0x02, 0x02, 0x64)
-            self._send_midi(midi_event_bytes)
-
-    def _periodic_execution(self):
-        # Do something here
-        self._periodic_check()
-        threading.Timer(0.3, self._periodic_execution).start()
-
-    def _periodic_check(self):
-        self._update_clip_slots()
+            self._bus.send(midi_event_bytes, INTERACTIVE)
+
+    def _setup_periodic_tasks(self):
+        # intervals are in display ticks of ~100 ms
+        self._scheduler.add_task('undo_redo', self._check_undo_redo, 3)
+        self._scheduler.add_task('clip_slots', self._check_clip_slots, CLIP_SLOT_CHECK_INTERVAL)
+        self._scheduler.add_task('clip_slot_flush', self._flush_clip_slots, 1)
+        self._scheduler.add_task('track_updates', self._flush_track_updates, 1)
+        self._scheduler.add_task('device_chain', self._flush_device_chain, 1)
+        self._scheduler.add_task('parameter_values', self._flush_parameter_values, PARAMETER_VALUE_INTERVAL)
+        self._scheduler.add_task('metadata_rows', self._flush_metadata_rows, 1)
+        self._scheduler.add_task('state_version', self._announce_state_version, 1)
+        self._scheduler.add_task('sysex_framer', self._framer.pump, 1)
+
+    def update_display(self):
+        super(MicroPush, self).update_display()
+        # a scroll through tracks or devices costs one selection change per tick
+        if self._pending_selections:
+            self._apply_pending_selections()
+        self._scheduler.tick()
+        # every tick, like MIDI the app's commands don't wait for skipped or deferred tasks
+        if self._network is not None:
+            self._network.poll(self._on_network_message)
+        # after the tasks, so whatever they queued goes out in this tick
+        self._bus.pump()
+
+    def _check_undo_redo(self):
         can_redo = self.song().can_redo
         can_undo = self.song().can_undo
         if can_redo != self._last_can_redo:
             self._last_can_redo = can_redo
             if can_redo:
                 midi_event_bytes = (0x90 | 0x02, 0x02, 0x64)
-                self._send_midi(midi_event_bytes)
+                self._bus.send(midi_event_bytes, INTERACTIVE)
             else:
                 midi_event_bytes = (0x80 | 0x02, 0x02, 0x64)
-                self._send_midi(midi_event_bytes)
+                self._bus.send(midi_event_bytes, INTERACTIVE)
 
         if can_undo != self._last_can_undo:
             self._last_can_undo = can_undo
             if can_undo:
                 midi_event_bytes = (0x90 | 0x02, 0x00, 0x64)
-                self._send_midi(midi_event_bytes)
+                self._bus.send(midi_event_bytes, INTERACTIVE)
             else:
                 midi_event_bytes = (0x80 | 0x02, 0x00, 0x64)
-                self._send_midi(midi_event_bytes)
-        # TODO: clean this whole thing up, never works I think and the next line is for what?
-        self.first_periodic_check = False
+                self._bus.send(midi_event_bytes, INTERACTIVE)
 
     def _redo_button_value(self, value):
         if value != 0:
             song = self.song()
             if song.can_redo:
                 song.redo()
-                # self._periodic_check()
+                # self._check_undo_redo()
 
     def _undo_button_value(self, value):
         if value != 0:
             song = self.song()
             if song.can_undo:
                 song.undo()
-                # self._periodic_check()
+                # self._check_undo_redo()
 
     def _sesh_record_value(self, value):
         if value != 0:
@@ -290,10 +810,9 @@ class MicroPush(ControlSurface):
     def _duplicate_scene_button_value(self, value):
         if value != 0:
             song = self.song()
-            selected_scene = song.view.selected_scene
-            all_scenes = song.scenes
-            current_index = list(all_scenes).index(selected_scene)
-            song.duplicate_scene(current_index)
+            current_index = self._scene_indices.index(song.view.selected_scene)
+            if current_index is not None:
+                song.duplicate_scene(current_index)
 
     def _duplicate_clip(self):
         selected_track = self.song().view.selected_track
@@ -301,10 +820,9 @@ class MicroPush(ControlSurface):
         if selected_track is None:
             return
 
-        song = self.song()
-        selected_scene = song.view.selected_scene
-        all_scenes = song.scenes
-        current_index = list(all_scenes).index(selected_scene)
+        current_index = self._scene_indices.index(self.song().view.selected_scene)
+        if current_index is None:
+            return
 
         duplicated_id = selected_track.duplicate_clip_slot(current_index)
 
@@ -323,10 +841,14 @@ class MicroPush(ControlSurface):
 
     @subject_slot('selected_track')
     def _on_selected_track_changed(self):
+        with self._diagnostics.measure('listener selected_track'):
+            self._selected_track_changed()
+
+    def _selected_track_changed(self):
         selected_track = self.song().view.selected_track
+        self._set_other_tracks_implicit_arm()
         if selected_track and selected_track.has_midi_input:
             self._set_selected_track_implicit_arm()
-        self._set_other_tracks_implicit_arm()
         # send new index of selected track
         self._send_selected_track_index(selected_track)
         self._on_selected_scene_changed()
@@ -339,28 +861,22 @@ class MicroPush(ControlSurface):
         self._device_component.set_device(device_to_select)
 
     def _send_selected_track_index(self, selected_track):
-        track_list = self.song().tracks
-        track_index = self._find_track_index(selected_track, track_list)
-        self._send_sys_ex_message(track_index, 0x03)
-        if track_index == "not found":
-            return_tracks_list = self.song().return_tracks
-            return_track_index = self._find_track_index(selected_track, return_tracks_list)
-            if return_track_index == "not found":
-                return_track_index = str(len(return_tracks_list))
-            self._send_sys_ex_message(return_track_index, 0x08)
+        track_index = self._track_indices.index(selected_track)
+        self._send_sys_ex_message(str(track_index) if track_index is not None else "not found", 0x03)
+        if track_index is None:
+            # not a track, so a return track or else the master
+            return_track_index = self._return_track_indices.index(selected_track)
+            if return_track_index is None:
+                return_track_index = len(self._return_track_indices)
+            self._send_sys_ex_message(str(return_track_index), 0x08)
         else:
             self._send_sys_ex_message("none selected", 0x08)
 
-    def _find_track_index(self, track, track_list):
-        for index, t in enumerate(track_list):
-            if track == t:
-                return str(index)
-        return "not found" # Track not found
-
     def _select_device_by_index(self, value):
         # self.log_message("Setting new device Index: {}".format(value))
-        device_to_select = self.song().view.selected_track.devices[value]
-        self.song().view.select_device(device_to_select)
+        devices = self.song().view.selected_track.devices
+        if value < len(devices):
+            self.song().view.select_device(devices[value])
 
     def _select_track_by_index(self, track_index):
         # self.log_message("Getting track: {}".format(track_index))
@@ -381,23 +897,123 @@ class MicroPush(ControlSurface):
 
     def _set_selected_track_implicit_arm(self):
         selected_track = self.song().view.selected_track
-        if selected_track:
-            selected_track.implicit_arm = True
-        else:
-            self.song().tracks[0].implicit_arm = True
+        if not selected_track:
+            selected_track = self.song().tracks[0]
+        selected_track.implicit_arm = True
+        self._implicitly_armed_track = selected_track
 
     def _set_other_tracks_implicit_arm(self):
-        for track in self.song().tracks:
-            if track != self.song().view.selected_track:
-                track.implicit_arm = False
+        # only the track armed last can still be armed, the others are left alone
+        armed_track = self._implicitly_armed_track
+        if armed_track is None or armed_track == self.song().view.selected_track:
+            return
+        if liveobj_valid(armed_track):
+            armed_track.implicit_arm = False
+        self._implicitly_armed_track = None
 
     def _on_tracks_changed(self):
+        self._track_indices.invalidate()
+        # the selection listener may have run before this one, with old indices
+        self._send_selected_track_index(self.song().view.selected_track)
         self._update_mixer_and_tracks()
+        self._register_track_listeners()
         self._register_clip_listeners()
-        self._update_clip_slots()
+        self._clip_grid_dirty = True
+        self._clear_metadata_rows()
 
-    # Updating names and number of tracks
-    def _update_mixer_and_tracks(self):
+    def _on_return_tracks_changed(self):
+        self._return_track_indices.invalidate()
+        self._send_selected_track_index(self.song().view.selected_track)
+        self._update_mixer_and_tracks()
+        self._register_track_listeners()
+
+    def _observed_tracks(self):
+        # (table, index, track) for every track with metadata the app shows
+        song = self.song()
+        for index, track in enumerate(song.tracks):
+            yield TRACK_TABLE_TRACKS, index, track
+        return_tracks = song.return_tracks
+        for index, track in enumerate(return_tracks):
+            yield TRACK_TABLE_RETURNS, index, track
+        yield TRACK_TABLE_RETURNS, len(return_tracks), song.master_track
+
+    def _register_track_listeners(self):
+        subjects = {}
+        master_track = self.song().master_track
+        for table, index, track in self._observed_tracks():
+            track_id = _live_id(track)
+            properties = ['name', 'color']
+            if track != master_track:
+                properties += ['mute', 'solo']
+            if getattr(track, 'can_be_armed', False):
+                properties.append('arm')
+            for property_name in properties:
+                subjects[(track_id, property_name)] = track
+        for key in self._track_listeners.sync(subjects):
+            callback = self._make_track_property_callback(*key)
+            self._track_listeners.register(key, subjects[key], (key[1], ), callback)
+
+    def _make_track_property_callback(self, track_id, property_name):
+        def callback():
+            self._dirty_track_properties.setdefault(track_id, set()).add(property_name)
+        return self._diagnostics.wrap('listener track ' + property_name, callback)
+
+    def _flush_track_updates(self):
+        if not self._dirty_track_properties:
+            return
+        dirty_properties = self._dirty_track_properties
+        self._dirty_track_properties = {}
+        tables, ascii = self._split_targets(CAPABILITY_STRING_TABLE)
+        if ascii and any(properties & {'name', 'color'} for properties in dirty_properties.values()):
+            # the ascii messages have no per-track update, resend the names and colors instead
+            self._send_track_names_and_colors(ascii)
+        if not tables:
+            return
+        updates = []
+        for table, index, track in self._observed_tracks():
+            properties = dirty_properties.get(_live_id(track))
+            if properties:
+                updates.append((table, index, track, properties))
+        for session in tables:
+            self._send_track_updates(session, updates)
+
+    def _send_track_updates(self, session, updates):
+        payloads = [self._track_update_payload(session, *update) for update in updates]
+        if session.string_table.is_full():
+            # ids past 14 bit would wrap around: fresh track tables start the
+            # string table over, and the updates refer to its new ids
+            self._send_track_tables(session)
+            payloads = [self._track_update_payload(session, *update) for update in updates]
+        definitions = session.string_table.take_definitions()
+        if definitions:
+            self._send_sys_ex_message(definitions, STRING_DEFINITION_MESSAGE, [session])
+        self._send_palette_entries(session)
+        for payload in payloads:
+            self._send_sys_ex_message(payload, TRACK_UPDATE_MESSAGE, [session])
+
+    def _track_update_payload(self, session, table, index, track, properties):
+        # table, index, then property id and value for every changed property
+        payload = bytearray((table, )) + bytearray(encode_14bit(index))
+        for property_name in sorted(properties, key=TRACK_PROPERTIES.get):
+            payload.append(TRACK_PROPERTIES[property_name])
+            if property_name == 'name':
+                payload.extend(encode_14bit(session.string_table.intern(track.name)))
+            elif property_name == 'color':
+                color_index = self._track_color_index(track)
+                self._learn_palette_color(session, color_index, track.color)
+                payload.append(color_index)
+            else:
+                payload.append(1 if getattr(track, property_name) else 0)
+        return payload
+
+    def _send_track_metadata(self):
+        tables, ascii = self._split_targets(CAPABILITY_STRING_TABLE)
+        for session in tables:
+            self._send_track_tables(session)
+        if ascii:
+            self._send_track_names_and_colors(ascii)
+
+    def _send_track_names_and_colors(self, sessions=None):
         # tracks = self.song().tracks
         # # send track names
         # track_names = ",".join([track.name for track in tracks])
@@ -420,11 +1036,11 @@ class MicroPush(ControlSurface):
 
         # send track names
         track_names_string = ",".join(track_names)
-        self._send_sys_ex_message(track_names_string, 0x02)
+        self._send_sys_ex_message(track_names_string, 0x02, sessions)
 
         # send track colors
         track_colors_string = "-".join(track_colors)
-        self._send_sys_ex_message(track_colors_string, 0x04)
+        self._send_sys_ex_message(track_colors_string, 0x04, sessions)
 
         return_track_names = []
         return_track_colors = []
@@ -450,180 +1066,925 @@ class MicroPush(ControlSurface):
 
         # send return track names
         return_track_names_string = ",".join(return_track_names)
-        self._send_sys_ex_message(return_track_names_string, 0x06)
+        self._send_sys_ex_message(return_track_names_string, 0x06, sessions)
 
         # send return track colors + master track
         track_colors_string = "-".join(return_track_colors)
-        self._send_sys_ex_message(track_colors_string, 0x07)
+        self._send_sys_ex_message(track_colors_string, 0x07, sessions)
+
+    def _send_track_tables(self, session):
+        song = self.song()
+        if session.string_table.is_full():
+            session.string_table.reset()
+        track_entries = [self._track_table_entry(session, track) for track in song.tracks]
+        # master is sent as the last return, like the 0x07 colors
+        return_entries = [self._track_table_entry(session, track) for track in song.return_tracks]
+        return_entries.append(self._track_table_entry(session, song.master_track))
+        # names and colors have to be known before the tables refer to them
+        definitions = session.string_table.take_definitions()
+        if definitions:
+            self._send_sys_ex_message(definitions, STRING_DEFINITION_MESSAGE, [session])
+        self._send_palette_entries(session)
+        self._send_track_table(session, TRACK_TABLE_TRACKS, track_entries)
+        self._send_track_table(session, TRACK_TABLE_RETURNS, return_entries)
+
+    def _track_table_entry(self, session, track):
+        color_index = self._track_color_index(track)
+        self._learn_palette_color(session, color_index, track.color)
+        return session.string_table.intern(track.name), color_index
+
+    def _track_color_index(self, track):
+        # the master track has no palette color, it gets the spare index 127
+        color_index = getattr(track, 'color_index', None)
+        if color_index is None or not 0 <= color_index < 127:
+            return 127
+        return color_index
+
+    def _learn_palette_color(self, session, color_index, color):
+        if session.sent_palette.get(color_index) != color:
+            session.sent_palette[color_index] = color
+            session.pending_palette.append((color_index, color))
+
+    def _send_palette_entries(self, session):
+        # count, then palette index and the 24 bit color packed into 4 bytes per entry
+        if not session.pending_palette:
+            return
+        payload = bytearray(encode_14bit(len(session.pending_palette)))
+        for color_index, color in session.pending_palette:
+            payload.append(color_index)
+            payload.extend(pack_values(((color >> 16) & 255, (color >> 8) & 255, color & 255), 8))
+        session.pending_palette = []
+        self._send_sys_ex_message(payload, PALETTE_MESSAGE, [session])
+
+    def _send_track_table(self, session, table, entries):
+        # table, count, then string id of the name and palette index per track
+        payload = bytearray((table, )) + bytearray(encode_14bit(len(entries)))
+        for name_id, color_index in entries:
+            payload.extend(encode_14bit(name_id))
+            payload.append(color_index)
+        self._send_sys_ex_message(payload, TRACK_TABLE_MESSAGE, [session])
 
+    # Updating names and number of tracks
+    def _update_mixer_and_tracks(self):
+        self._send_track_metadata()
+        self._update_mixer_strips()
 
-        # Channels
-        for index, track in enumerate(self.song().tracks):
+    def _update_mixer_strips(self):
+        # Channels, strip n shows track n of the session ring
+        tracks = self.song().tracks
+        track_offset = self._ring_track_offset if self._ring_active else 0
+        for index in range(mixer.channel_strip_count()):
+            if track_offset + index >= len(tracks):
+                break
+            track = tracks[track_offset + index]
             strip = mixer.channel_strip(index)
-            
+            if not self._strip_needs_binding(('track', index), track):
+                continue
+
             # Configure strip controls for each channel track
-            
+
             # VolumeSlider control
-            volume_slider = SliderElement(MIDI_CC_TYPE, index, 7)  # Replace 7 with the appropriate MIDI CC number for volume control
-            strip.set_volume_control(volume_slider)
-            
-            # Send1Knob control
-            send1_knob = EncoderElement(MIDI_CC_TYPE, index, 40, Live.MidiMap.MapMode.absolute)
-            
-            
-            # Send2Knob control
-            send2_knob = EncoderElement(MIDI_CC_TYPE, index, 41, Live.MidiMap.MapMode.absolute)  # Replace 48 with the appropriate MIDI CC number for Send B control
-            strip.set_send_controls((send1_knob, send2_knob,))
-            
+            strip.set_volume_control(self._control_pool.slider(index, 7))
+
+            # Send1Knob and Send2Knob control
+            strip.set_send_controls((self._control_pool.encoder(index, 40), self._control_pool.encoder(index, 41)))
+
             # Pan
-            pan_knob = EncoderElement(MIDI_CC_TYPE, index, 42, Live.MidiMap.MapMode.absolute)
-            strip.set_pan_control(pan_knob)
+            strip.set_pan_control(self._control_pool.encoder(index, 42))
 
             # TrackMuteButton control
-            mute_button = ButtonElement(1, MIDI_CC_TYPE, index, 44)
-            strip.set_mute_button(mute_button)
+            strip.set_mute_button(self._control_pool.button(index, 44))
 
             # Solo button control
-            solo_button = ButtonElement(1, MIDI_CC_TYPE, index, 43)
-            strip.set_solo_button(solo_button)
-            
+            strip.set_solo_button(self._control_pool.button(index, 43))
+
             # Other strip controls can be configured similarly
             # strip.set_arm_button(...)
             # strip.set_shift_button(...)
-        
+
         # Master / channel 7 cc 127
-        mixer.master_strip().set_volume_control(SliderElement(MIDI_CC_TYPE, 0, 127))
-        mixer.set_prehear_volume_control(EncoderElement(MIDI_CC_TYPE, 0, 126, Live.MidiMap.MapMode.absolute))
-        mixer.master_strip().set_pan_control(EncoderElement(MIDI_CC_TYPE, 0, 125, Live.MidiMap.MapMode.absolute))
+        master_strip = mixer.master_strip()
+        if self._strip_needs_binding(('master', ), self.song().master_track):
+            master_strip.set_volume_control(self._control_pool.slider(0, 127))
+            mixer.set_prehear_volume_control(self._control_pool.encoder(0, 126))
+            master_strip.set_pan_control(self._control_pool.encoder(0, 125))
 
         # Return Tracks
-        for index, returnTrack in enumerate(self.song().return_tracks):
+        return_tracks = self.song().return_tracks
+        mixer.ensure_return_strips(len(return_tracks))
+        for index, returnTrack in enumerate(return_tracks):
+            if index >= mixer.return_strip_count():
+                break
             strip = mixer.return_strip(index)
+            if not self._strip_needs_binding(('return', index), returnTrack):
+                continue
 
             # VolumeSlider
-            return_volume_slider = SliderElement(MIDI_CC_TYPE, index, 8)  # Replace 7 with the appropriate MIDI CC number for return track volume control
-            strip.set_volume_control(return_volume_slider)
+            strip.set_volume_control(self._control_pool.slider(index, 8))
 
             # TrackMuteButton control
-            mute_button = ButtonElement(1, MIDI_CC_TYPE, index, 10)
-            strip.set_mute_button(mute_button)
+            strip.set_mute_button(self._control_pool.button(index, 10))
 
             # Solo button control
-            solo_button = ButtonElement(1, MIDI_CC_TYPE, index, 9)
-            strip.set_solo_button(solo_button)
+            strip.set_solo_button(self._control_pool.button(index, 9))
 
-            # Send1Knob control
-            send1_knob = EncoderElement(MIDI_CC_TYPE, index, 11, Live.MidiMap.MapMode.absolute)  # Replace 40 with the appropriate MIDI CC number for Send A control
-            
-            
-            # Send2Knob control
-            send2_knob = EncoderElement(MIDI_CC_TYPE, index, 12, Live.MidiMap.MapMode.absolute)  # Replace 48 with the appropriate MIDI CC number for Send B control
-            strip.set_send_controls((send1_knob, send2_knob,))
+            # Send1Knob and Send2Knob control
+            strip.set_send_controls((self._control_pool.encoder(index, 11), self._control_pool.encoder(index, 12)))
 
             # Pan
-            pan_knob = EncoderElement(MIDI_CC_TYPE, index, 13, Live.MidiMap.MapMode.absolute)
-            strip.set_pan_control(pan_knob)
+            strip.set_pan_control(self._control_pool.encoder(index, 13))
+
+    def _strip_needs_binding(self, strip_key, track):
+        track_id = _live_id(track)
+        if self._bound_strip_tracks.get(strip_key) == track_id:
+            return False
+        self._bound_strip_tracks[strip_key] = track_id
+        return True
 
     # clipSlots
-    def _register_clip_listeners(self):
-        for track in self.song().tracks:
-            for clip_slot in track.clip_slots:
+    def _observed_area(self):
+        # first track, last track, first scene and last scene (exclusive) of the observed clip slots
+        song = self.song()
+        track_count = len(song.tracks)
+        scene_count = len(song.scenes)
+        if not self._ring_active:
+            return 0, track_count, 0, scene_count
+        first_track = min(track_count, max(0, self._ring_track_offset - RING_TRACK_MARGIN))
+        first_scene = min(scene_count, max(0, self._ring_scene_offset - RING_SCENE_MARGIN))
+        last_track = track_count
+        if self._ring_width:
+            last_track = min(track_count, self._ring_track_offset + self._ring_width + RING_TRACK_MARGIN)
+        last_scene = scene_count
+        if self._ring_height:
+            last_scene = min(scene_count, self._ring_scene_offset + self._ring_height + RING_SCENE_MARGIN)
+        return first_track, max(first_track, last_track), first_scene, max(first_scene, last_scene)
+
+    def _observed_clip_slots(self, track, first_scene, last_scene):
+        clip_slots = track.clip_slots
+        return [clip_slots[index] for index in range(first_scene, min(last_scene, len(clip_slots)))]
 
-                if clip_slot == None:
+    def _register_clip_listeners(self):
+        # only tracks and scenes that were added, removed or moved in or out of
+        # the observed area touch the listeners, and only their slots are read
+        first_track, last_track, first_scene, last_scene = self._observed_area()
+        song = self.song()
+        tracks = song.tracks
+        scenes = song.scenes
+        observed_tracks = [(track_index, tracks[track_index]) for track_index in range(first_track, last_track)]
+        observed_scenes = [(scene_index, _live_id(scenes[scene_index]))
+                           for scene_index in range(first_scene, last_scene)]
+        track_ids = set(_live_id(track) for track_index, track in observed_tracks)
+        scene_ids = set(scene_id for scene_index, scene_id in observed_scenes)
+        removed_track_ids = self._observed_track_ids - track_ids
+        removed_scene_ids = self._observed_scene_ids - scene_ids
+        if removed_track_ids or removed_scene_ids:
+            for key in self._clip_slot_listeners.keys():
+                if key[0] in removed_track_ids or key[1] in removed_scene_ids:
+                    self._clip_slot_listeners.unregister(key)
+        added_scenes = [(scene_index, scene_id) for scene_index, scene_id in observed_scenes
+                        if scene_id not in self._observed_scene_ids]
+        callbacks = {}
+        for track_index, track in observed_tracks:
+            track_id = _live_id(track)
+            callback = self._clip_slot_callbacks.get(track_id) or self._make_clip_slot_callback(track_id)
+            callbacks[track_id] = callback
+            # new tracks need all their observed slots, known tracks only the new scenes
+            scenes_to_add = observed_scenes if track_id not in self._observed_track_ids else added_scenes
+            if not scenes_to_add:
+                continue
+            clip_slots = track.clip_slots
+            for scene_index, scene_id in scenes_to_add:
+                if scene_index >= len(clip_slots) or clip_slots[scene_index] == None:
                     continue
-                # do this to ignore return-tracks
-                # if not clip_slot.has_stop_button:
-                #     continue
-
-                if not clip_slot.has_clip_has_listener(self._on_clip_has_clip_changed):
-                    clip_slot.add_has_clip_listener(self._on_clip_has_clip_changed)
-
-                if not clip_slot.is_triggered_has_listener(self._on_clip_playing_status_changed):
-                    clip_slot.add_is_triggered_listener(self._on_clip_playing_status_changed)
-
-                # if clip_slot.has_clip:
-                #     if not clip_slot.clip.playing_position_has_listener(self._on_playing_position_changed):
-                #         clip_slot.clip.add_playing_position_listener(self._on_playing_position_changed)
-
-
-                                #     # if not clip_slot.playing_status_has_listener(self._on_clip_playing_status_changed):
-                #     #     # self.log_message("adding a playing status listener")
-                #     #     clip_slot.clip.add_playing_status_listener(self._on_clip_playing_status_changed)
- 
+                self._clip_slot_listeners.register((track_id, scene_id), clip_slots[scene_index],
+                                                   ('has_clip', 'is_triggered', 'playing_status'), callback)
+        self._observed_track_ids = track_ids
+        self._observed_scene_ids = scene_ids
+        # forget callbacks of tracks that are gone or out of view
+        self._clip_slot_callbacks = callbacks
 
     def _unregister_clip_listeners(self):
-        for track in self.song().tracks:
-            for clip_slot in track.clip_slots:
-                clip_slot.remove_is_triggered_listener(self._on_clip_playing_status_changed)
-                clip_slot.remove_has_clip_listener(self._on_clip_has_clip_changed)
-                # if clip_slot.has_clip:
-                #     # clip_slot.clip.remove_playing_status_listener(self._on_clip_playing_status_changed)
-                #     clip_slot.clip.remove_playing_position_listener(self._on_playing_position_changed)
-
-    # def _on_playing_position_changed(self):
-    #     # self.log_message("trying to log the playing position")
-    #     self._update_clip_slots()
+        # the registry knows every slot it listens to, no need to walk the song
+        self._clip_slot_listeners.disconnect()
+        self._clip_slot_callbacks = {}
+        self._observed_track_ids = set()
+        self._observed_scene_ids = set()
+
+    def _on_scenes_changed(self):
+        self._scene_indices.invalidate()
+        self._on_selected_scene_changed()
+        self._register_clip_listeners()
+        self._clip_grid_dirty = True
+        self._clear_metadata_rows()
 
-    def _on_clip_playing_status_changed(self):
-        # self.log_message("clip playing status changed")
-        self._update_clip_slots()
+    def _make_clip_slot_callback(self, track_id):
+        def callback():
+            self._on_clip_slot_changed(track_id)
+        return self._diagnostics.wrap('listener clip slot', callback)
 
-    def _on_clip_has_clip_changed(self):
-        # self.log_message("has clip status changed")
-        self._update_clip_slots()
+    def _on_clip_slot_changed(self, track_id):
+        # only mark the track here, the next tick sends everything that changed in one go
+        self._dirty_clip_tracks.add(track_id)
+        self._clip_flush_stats['pending'] += 1
 
-    def _update_clip_slots(self):
-        track_clips = []
+    def _flush_clip_slots(self):
+        if not self._dirty_clip_tracks and not self._clip_grid_dirty:
+            return
+        stats = self._clip_flush_stats
+        stats['flushes'] += 1
+        stats['callbacks'] += stats['pending']
+        stats['last_coalesced'] = stats['pending']
+        stats['max_coalesced'] = max(stats['max_coalesced'], stats['pending'])
+        stats['pending'] = 0
+        dirty_tracks = self._dirty_clip_tracks
+        self._dirty_clip_tracks = set()
+        first_track, last_track, first_scene, last_scene = self._observed_area()
+        if self._clip_grid_dirty or (first_track, first_scene) != self._clip_grid_origin \
+                or last_track - first_track != len(self._clip_slot_states):
+            self._clip_grid_dirty = False
+            self._update_clip_slots()
+            return
+        tracks = self.song().tracks
+        states = list(self._clip_slot_states)
+        for track_index in range(first_track, last_track):
+            track = tracks[track_index]
+            if _live_id(track) in dirty_tracks:
+                states[track_index - first_track] = self._read_clip_slot_states(track, first_scene, last_scene)
+        self._update_clip_slots(states=states)
+
+    def _check_clip_slots(self):
+        # listeners keep the states current, this only reads the slots the app shows
+        if not self._ring_active or not self._ring_width or not self._ring_height:
+            return
+        tracks = self.song().tracks
+        first_track, first_scene = self._clip_grid_origin
+        last_track = min(len(tracks), self._ring_track_offset + self._ring_width)
+        for track_index in range(self._ring_track_offset, last_track):
+            track_offset = track_index - first_track
+            if not 0 <= track_offset < len(self._clip_slot_states):
+                continue
+            known_states = self._clip_slot_states[track_offset]
+            clip_slots = tracks[track_index].clip_slots
+            last_scene = min(len(clip_slots), self._ring_scene_offset + self._ring_height)
+            for scene_index in range(self._ring_scene_offset, last_scene):
+                scene_offset = scene_index - first_scene
+                if 0 <= scene_offset < len(known_states) \
+                        and self._clip_slot_state(clip_slots[scene_index]) != known_states[scene_offset]:
+                    self._dirty_clip_tracks.add(_live_id(tracks[track_index]))
+                    break
+
+    def _clip_slot_state(self, clip_slot):
+        state = 0
+        if clip_slot.has_clip:
+            state |= CLIP_HAS_CLIP
+        if clip_slot.is_playing:
+            state |= CLIP_IS_PLAYING
+        if clip_slot.is_recording:
+            state |= CLIP_IS_RECORDING
+        if clip_slot.is_triggered:
+            state |= CLIP_IS_TRIGGERED
+        return state
+
+    def _clip_state_string(self, state):
+        # "hasClip isPlaying isRecording isTriggered" as four 0/1 characters
+        return "{}{}{}{}".format(state >> 3 & 1, state >> 2 & 1, state >> 1 & 1, state & 1)
+
+    def _read_clip_slot_states(self, track, first_scene, last_scene):
+        return [self._clip_slot_state(clip_slot) for clip_slot in self._observed_clip_slots(track, first_scene, last_scene)]
+
+    def _update_clip_slots(self, force_full=False, states=None):
+        first_track, last_track, first_scene, last_scene = self._observed_area()
+        if states is None:
+            tracks = self.song().tracks
+            states = [self._read_clip_slot_states(tracks[track_index], first_scene, last_scene)
+                      for track_index in range(first_track, last_track)]
+        previous_states = self._clip_slot_states
+        previous_origin = self._clip_grid_origin
+        self._clip_slot_states = states
+        self._clip_grid_origin = (first_track, first_scene)
+        # a delta can only describe slots the app already knows about, so resend the
+        # whole grid when tracks or scenes were added or removed or the ring moved
+        shape_changed = previous_origin != self._clip_grid_origin or len(states) != len(previous_states) or any(
+            len(track_states) != len(previous_track_states)
+            for track_states, previous_track_states in zip(states, previous_states))
+        if force_full or shape_changed:
+            self._send_clip_slots(states)
+        else:
+            self._send_clip_slot_delta(states, previous_states)
+
+    def _send_clip_slots(self, states):
+        # the ring tells the app where the grid starts
+        if self._ring_active:
+            self._send_session_ring()
+        binary, ascii = self._split_targets(CAPABILITY_BINARY_CLIP_GRID)
+        if binary:
+            self._send_sys_ex_message(encode_clip_grid(states), BINARY_CLIP_GRID_MESSAGE, binary)
+        if ascii:
+            # full grid: slots separated by "-", tracks separated by "/"
+            track_clips_string = "/".join(
+                "-".join(self._clip_state_string(state) for state in track_states)
+                for track_states in states)
+            self._send_sys_ex_message(track_clips_string, 0x05, ascii)
+
+    def _send_clip_slot_delta(self, states, previous_states):
+        # deltas carry song indices, not indices into the observed area
+        first_track, first_scene = self._clip_grid_origin
+        changes = []
+        for track_index, track_states in enumerate(states):
+            previous_track_states = previous_states[track_index]
+            if track_states == previous_track_states:
+                continue
+            for scene_index, state in enumerate(track_states):
+                if state != previous_track_states[scene_index]:
+                    changes.append((first_track + track_index, first_scene + scene_index, state))
+        if not changes:
+            return
+        binary, ascii = self._split_targets(CAPABILITY_BINARY_CLIP_GRID)
+        if binary:
+            self._send_sys_ex_message(encode_clip_delta(changes), BINARY_SLOT_DELTA_MESSAGE, binary)
+        if ascii:
+            # "track,scene,state" tuples separated by "/"
+            delta_string = "/".join("{},{},{}".format(track_index, scene_index, self._clip_state_string(state))
+                                    for track_index, scene_index, state in changes)
+            self._send_sys_ex_message(delta_string, SLOT_DELTA_MESSAGE, ascii)
+
+    def _set_session_ring(self, track_offset, scene_offset, width, height):
+        self._ring_active = True
+        self._ring_track_offset = track_offset
+        self._ring_scene_offset = scene_offset
+        self._ring_width = width
+        self._ring_height = height
+        mixer.set_track_offset(track_offset)
+        self._update_mixer_strips()
+        self._register_clip_listeners()
+        self._update_clip_slots(force_full=True)
+
+    def _send_session_ring(self):
+        # ring offsets and size, then first track, first scene, track count and scene count
+        # of the observed area the grids describe, all 14 bit
+        first_track, last_track, first_scene, last_scene = self._observed_area()
+        payload = bytearray()
+        for value in (self._ring_track_offset, self._ring_scene_offset, self._ring_width, self._ring_height,
+                      first_track, first_scene, last_track - first_track, last_scene - first_scene):
+            payload.extend(encode_14bit(value))
+        self._send_sys_ex_message(payload, SESSION_RING_MESSAGE)
+
+    def _set_playback_progress_rate(self, rate):
+        # rate in Hz, 0 turns the stream off. Positions can't be sampled faster
+        # than the display tick, so anything above 10 Hz samples every tick
+        self._scheduler.remove_task('playback_progress')
+        self._playback_positions = {}
+        if rate:
+            interval = max(1, int(round(1.0 / (TICK_PERIOD * rate))))
+            self._scheduler.add_task('playback_progress', self._send_playback_progress, interval)
+
+    def _send_playback_progress(self):
+        # the grid states already tell which slots play, so only those clips are read
+        tracks = self.song().tracks
+        first_track, first_scene = self._clip_grid_origin
+        positions = {}
+        changes = []
+        for track_offset, track_states in enumerate(self._clip_slot_states):
+            track_index = first_track + track_offset
+            if track_index >= len(tracks):
+                break
+            clip_slots = None
+            for scene_offset, state in enumerate(track_states):
+                if not state & (CLIP_IS_PLAYING | CLIP_IS_RECORDING):
+                    continue
+                if clip_slots is None:
+                    clip_slots = tracks[track_index].clip_slots
+                scene_index = first_scene + scene_offset
+                if scene_index >= len(clip_slots) or not clip_slots[scene_index].has_clip:
+                    continue
+                key = (track_index, scene_index)
+                position = positions[key] = self._quantized_clip_position(clip_slots[scene_index].clip)
+                if self._playback_positions.get(key) != position:
+                    changes.append((track_index, scene_index, position))
+        self._playback_positions = positions
+        if changes:
+            # count, then track, scene (14 bit) and position (0-127 over the loop) per clip
+            payload = bytearray(encode_14bit(len(changes)))
+            for track_index, scene_index, position in changes:
+                payload.extend(encode_14bit(track_index))
+                payload.extend(encode_14bit(scene_index))
+                payload.append(position)
+            self._send_sys_ex_message(payload, PLAYBACK_PROGRESS_MESSAGE)
+
+    def _quantized_clip_position(self, clip):
+        loop_length = clip.loop_end - clip.loop_start
+        if loop_length <= 0:
+            return 0
+        position = (clip.playing_position - clip.loop_start) / loop_length
+        return min(127, max(0, int(position * 128)))
+
+    def _set_meters(self, rate, first_track, track_count, include_returns):
+        # rate in Hz, 0 turns metering off, capped at the 10 Hz display tick
+        self._scheduler.remove_task('meters')
+        self._meter_first_track = first_track
+        self._meter_track_count = track_count
+        self._meter_returns = include_returns
+        self._meter_levels = {}
+        if rate:
+            interval = max(1, int(round(1.0 / (TICK_PERIOD * rate))))
+            self._scheduler.add_task('meters', self._send_meters, interval)
+
+    def _metered_tracks(self):
+        song = self.song()
+        tracks = song.tracks
+        last_track = min(len(tracks), self._meter_first_track + self._meter_track_count)
+        for index in range(self._meter_first_track, last_track):
+            yield TRACK_TABLE_TRACKS, index, tracks[index]
+        if self._meter_returns:
+            return_tracks = song.return_tracks
+            for index, track in enumerate(return_tracks):
+                yield TRACK_TABLE_RETURNS, index, track
+            yield TRACK_TABLE_RETURNS, len(return_tracks), song.master_track
+
+    def _send_meters(self):
+        levels = self._meter_levels
+        changes = []
+        for table, index, track in self._metered_tracks():
+            level = (int(track.output_meter_left * 127 + 0.5), int(track.output_meter_right * 127 + 0.5))
+            key = (table, index)
+            last_level = levels.get(key)
+            if last_level is None or self._meter_changed(last_level[0], level[0]) \
+                    or self._meter_changed(last_level[1], level[1]):
+                levels[key] = level
+                changes.append((table, index, level))
+        if changes:
+            # count, then table, index (14 bit), left and right (0-127) per track
+            payload = bytearray(encode_14bit(len(changes)))
+            for table, index, level in changes:
+                payload.append(table)
+                payload.extend(encode_14bit(index))
+                payload.extend(level)
+            self._send_sys_ex_message(payload, METER_MESSAGE)
+
+    def _meter_changed(self, last_value, value):
+        if value == last_value:
+            return False
+        return value == 0 or abs(value - last_value) >= METER_HYSTERESIS
+
+    def _set_clip_notes_streaming(self, streaming):
+        view = self.song().view
+        if streaming and not self._notes_streaming:
+            view.add_detail_clip_listener(self._detail_clip_listener)
+            self._scheduler.add_task('clip_notes', self._flush_clip_notes, 1)
+        elif not streaming and self._notes_streaming:
+            view.remove_detail_clip_listener(self._detail_clip_listener)
+            self._scheduler.remove_task('clip_notes')
+            self._observe_notes_clip(None)
+            self._sent_notes = {}
+            self._pending_note_pages = []
+        self._notes_streaming = streaming
+        # a new dump, also when the app asks again
+        self._notes_clip_changed = streaming
+
+    def _on_detail_clip_changed(self):
+        self._notes_clip_changed = True
+
+    def _on_clip_notes_changed(self):
+        self._notes_dirty = True
+
+    def _observe_notes_clip(self, clip):
+        previous = self._notes_clip
+        if liveobj_valid(previous) and previous.notes_has_listener(self._clip_notes_listener):
+            previous.remove_notes_listener(self._clip_notes_listener)
+        if clip is not None:
+            clip.add_notes_listener(self._clip_notes_listener)
+        self._notes_clip = clip
+
+    def _flush_clip_notes(self):
+        # diffs wait until the app has the whole dump, they are taken against it
+        if self._notes_clip_changed:
+            self._notes_clip_changed = False
+            self._start_note_dump()
+        if self._pending_note_pages:
+            self._send_note_page()
+        elif self._notes_dirty:
+            self._notes_dirty = False
+            self._send_note_diff()
+
+    def _start_note_dump(self):
+        clip = self.song().view.detail_clip
+        if not liveobj_valid(clip) or not clip.is_midi_clip:
+            clip = None
+        self._observe_notes_clip(clip)
+        self._notes_generation = (self._notes_generation + 1) & 0x3FFF
+        self._notes_dirty = False
+        self._sent_notes = self._read_clip_notes(clip) if clip is not None else {}
+        # earliest notes first, so the app can draw the start of the clip before the rest arrives
+        notes = sorted(self._sent_notes.items(), key=lambda item: (item[1][1], item[1][0]))
+        pages = [notes[index:index + CLIP_NOTES_PER_PAGE] for index in range(0, len(notes), CLIP_NOTES_PER_PAGE)]
+        if clip is not None and not pages:
+            pages = [[]]
+        if not pages:
+            # no MIDI clip in detail view: a dump of no pages
+            self._send_sys_ex_message(encode_clip_notes(self._notes_generation, 0, 0, ()), CLIP_NOTES_MESSAGE)
+        self._pending_note_pages = pages
+        self._note_page_count = len(pages)
+
+    def _send_note_page(self):
+        page_index = self._note_page_count - len(self._pending_note_pages)
+        notes = self._pending_note_pages.pop(0)
+        self._send_sys_ex_message(encode_clip_notes(self._notes_generation, page_index, self._note_page_count, notes),
+                                  CLIP_NOTES_MESSAGE)
+
+    def _send_note_diff(self):
+        clip = self._notes_clip
+        if not liveobj_valid(clip):
+            self._notes_clip_changed = True
+            return
+        notes = self._read_clip_notes(clip)
+        sent = self._sent_notes
+        removed = [note_id for note_id in sent if note_id not in notes]
+        changed = [(note_id, note) for note_id, note in notes.items() if sent.get(note_id) != note]
+        self._sent_notes = notes
+        while removed or changed:
+            removing = removed[:CLIP_NOTES_PER_PAGE]
+            removed = removed[len(removing):]
+            changing = changed[:CLIP_NOTES_PER_PAGE - len(removing)]
+            changed = changed[len(changing):]
+            self._send_sys_ex_message(encode_note_diff(self._notes_generation, removing, changing),
+                                      CLIP_NOTE_DIFF_MESSAGE)
+
+    def _read_clip_notes(self, clip):
+        # note id -> (pitch, start, duration, velocity, mute), times in ticks
+        notes = {}
+        for note in clip.get_all_notes_extended():
+            notes[note.note_id] = (note.pitch, max(0, int(round(note.start_time * NOTE_TIME_RESOLUTION))),
+                                   max(0, int(round(note.duration * NOTE_TIME_RESOLUTION))),
+                                   int(round(note.velocity)), bool(note.mute))
+        return notes
+
+    def _send_scene_metadata(self, scene_indices):
+        # scene count, row count, then scene index (14 bit) and row per scene
+        scenes = self.song().scenes
+        indices = [index for index in scene_indices if index < len(scenes)]
+        payload = bytearray(encode_14bit(len(scenes)))
+        payload.extend(encode_14bit(len(indices)))
+        for index in indices:
+            payload.extend(encode_14bit(index))
+            payload.extend(self._metadata_row((SCENE_METADATA_MESSAGE, index)))
+        self._send_sys_ex_message(payload, SCENE_METADATA_MESSAGE)
+
+    def _send_clip_metadata(self, track_index, scene_indices):
+        # track, scene count, row count, then scene index (14 bit) and row per clip slot
+        tracks = self.song().tracks
+        if track_index >= len(tracks):
+            return
+        slot_count = len(tracks[track_index].clip_slots)
+        indices = [index for index in scene_indices if index < slot_count]
+        payload = bytearray(encode_14bit(track_index))
+        payload.extend(encode_14bit(slot_count))
+        payload.extend(encode_14bit(len(indices)))
+        for index in indices:
+            payload.extend(encode_14bit(index))
+            payload.extend(self._metadata_row((CLIP_METADATA_MESSAGE, track_index, index)))
+        self._send_sys_ex_message(payload, CLIP_METADATA_MESSAGE)
+
+    def _metadata_row(self, key):
+        row = self._metadata_rows.get(key)
+        if row is not None:
+            return row
+        if key[0] == SCENE_METADATA_MESSAGE:
+            scene = self.song().scenes[key[1]]
+            row = self._encode_metadata_row(True, scene.name, scene.color)
+            subjects = ((scene, ('name', 'color')), )
+        else:
+            slot = self.song().tracks[key[1]].clip_slots[key[2]]
+            if slot.has_clip:
+                clip = slot.clip
+                row = self._encode_metadata_row(True, clip.name, clip.color)
+                subjects = ((slot, ('has_clip', )), (clip, ('name', 'color')))
+            else:
+                row = self._encode_metadata_row(False, '', 0)
+                subjects = ((slot, ('has_clip', )), )
+        self._metadata_rows.put(key, row, subjects)
+        return row
+
+    def _encode_metadata_row(self, present, name, color):
+        # 1 for a scene or a slot with a clip, the 24 bit color packed into 4 bytes,
+        # then the UTF-8 name as byte length (14 bit) and bytes packed into 7-bit bytes
+        data = name.encode('utf-8')
+        row = bytearray((1 if present else 0, ))
+        row.extend(pack_values(((color >> 16) & 255, (color >> 8) & 255, color & 255), 8))
+        row.extend(encode_14bit(len(data)))
+        row.extend(pack_values(bytearray(data), 8))
+        return bytes(row)
+
+    def _on_metadata_row_changed(self, key):
+        self._dirty_metadata_rows.add(key)
+
+    def _flush_metadata_rows(self):
+        # changed rows go out the way they were fetched, scenes in one message and clips one per track
+        if not self._dirty_metadata_rows:
+            return
+        dirty = sorted(self._dirty_metadata_rows)
+        self._dirty_metadata_rows = set()
+        scene_indices = [key[1] for key in dirty if key[0] == SCENE_METADATA_MESSAGE]
+        if scene_indices:
+            self._send_scene_metadata(scene_indices)
+        clip_indices = {}
+        for key in dirty:
+            if key[0] == CLIP_METADATA_MESSAGE:
+                clip_indices.setdefault(key[1], []).append(key[2])
+        for track_index, indices in sorted(clip_indices.items()):
+            self._send_clip_metadata(track_index, indices)
+
+    def _clear_metadata_rows(self):
+        # positions moved, the app fetches the rows it shows again
+        self._metadata_rows.clear()
+        self._dirty_metadata_rows = set()
+
+    def _resync(self, session=None):
+        # full snapshot of tracks, returns, clips, selection and device, for one app or all of them
+        sessions = self._sessions if session is None else [session]
+        partial = len(sessions) < len(self._sessions)
+        if partial:
+            # changes not sent yet go to every app first, so the snapshot matches what the others know
+            self._flush_clip_slots()
+            self._flush_track_updates()
+            self._flush_device_chain()
+        with self._sending_to(sessions):
+            for target in sessions:
+                target.forget()
+            self._send_track_metadata()
+            if partial:
+                # the grid the others know, reading it again would keep changes found meanwhile from them
+                self._send_clip_slots(self._clip_slot_states)
+            else:
+                self._update_clip_slots(force_full=True)
+            self._send_selected_track_index(self.song().view.selected_track)
+            self._on_selected_scene_changed()
+            self._on_device_changed()
+        if self._notes_streaming:
+            self._notes_clip_changed = True
+
+    def _resync_since(self, session, session_id, version):
+        # the journal holds what the MIDI app was sent, apps on the network get a full resync
+        missed = self._journal.since(session_id, version) if session is self._midi_session else None
+        if missed is None:
+            self._resync(session)
+            return
+        session.forget()
+        for message_id, data in missed:
+            self._send_sys_ex_data(session, data, message_id)
+        self._announced_version = None
 
-        for track in self.song().tracks:
-            # track clip slots
-            clip_slots = []
-            for clip_slot in track.clip_slots:
-                clip_data = {
-                    'hasClip': clip_slot.has_clip,
-                    'isPlaying': clip_slot.is_playing,
-                    'isRecording': clip_slot.is_recording,
-                    'isTriggered': clip_slot.is_triggered
-                }
-                has_clip_value = 1 if clip_data['hasClip'] else 0
-                is_playing_value = 1 if clip_data['isPlaying'] else 0
-                is_recording_value = 1 if clip_data['isRecording'] else 0
-                is_triggered_value = 1 if clip_data['isTriggered'] else 0
-                # if clip_slot.has_clip:
-                #     playing_position = clip_slot.clip.playing_position
-                #     length = clip_slot.clip.length
-                #     self.log_message("playing: {} triggering {}".format(is_playing_value, is_triggered_value))
-                # else:
-                #     playing_position = 0.0
-                #     length = 0.0
-                
-                clip_string = "{}{}{}{}".format(has_clip_value, is_playing_value, is_recording_value, is_triggered_value)
-                clip_slots.append(clip_string)
-            clip_slots_string = "-".join(clip_slots)
-            track_clips.append(clip_slots_string)
-            
-        # send track clips
-        track_clips_string = "/".join(track_clips)
-        self._send_sys_ex_message(track_clips_string, 0x05)
+    def _announce_state_version(self):
+        if not self._midi_session.capabilities & CAPABILITY_STATE_VERSIONS:
+            return
+        # chunked state still on its way would arrive after the version it belongs to
+        if self._journal.version == self._announced_version or self._framer.has_pending():
+            return
+        self._announced_version = self._journal.version
+        self._send_sys_ex_message(self._state_version_payload(), STATE_VERSION_MESSAGE, [self._midi_session])
+
+    def _state_version_payload(self):
+        # session id (14 bit) and version (28 bit)
+        version = self._journal.version
+        return encode_14bit(self._journal.session_id) + encode_14bit(version >> 14) + encode_14bit(version & 0x3FFF)
+
+    def _on_hello(self, values):
+        # protocol version, then the requested capability flags as 14 bit; only
+        # the app that sent it starts over
+        if len(values) < 3:
+            return
+        session = self._command_session
+        session.reset(decode_14bit(values[1], values[2]))
+        if session is self._midi_session:
+            self._framer.reset()
+            self._bus.reset()
+            self._framer.set_acknowledged(bool(session.capabilities & CAPABILITY_CHUNK_ACK))
+        reply = (PROTOCOL_VERSION, ) + encode_14bit(session.capabilities)
+        self._send_sys_ex_message(reply, HELLO_MESSAGE, [session])
+        self._resync(session)
+
+    def _set_recording(self, recording):
+        self._scheduler.remove_task('traffic_recorder')
+        if not recording:
+            if self._recorder.recording:
+                self._recorder.stop()
+                self.log_message("Recorded {} messages to {}".format(self._recorder.records, self._recorder.path))
+            return
+        song = self.song()
+        try:
+            self._recorder.start(default_recording_path(RECORDING_DIRECTORY), len(song.tracks), len(song.scenes),
+                                 len(song.return_tracks))
+        except (IOError, OSError) as error:
+            self.log_message("Could not start recording: {}".format(error))
+            return
+        self._scheduler.add_task('traffic_recorder', self._recorder.flush, RECORDING_FLUSH_INTERVAL)
+        self.log_message("Recording traffic to {}".format(self._recorder.path))
+
+    def _set_diagnostics(self, enabled, digest_period=0):
+        self._diagnostics.enabled = enabled
+        self._scheduler.remove_task('diagnostics_digest')
+        if enabled and digest_period:
+            interval = max(1, int(round(digest_period / TICK_PERIOD)))
+            self._scheduler.add_task('diagnostics_digest', self._log_diagnostics, interval)
+
+    def _log_diagnostics(self):
+        for line in self._diagnostics.digest(self._diagnostic_counters()):
+            self.log_message(line)
+
+    def _diagnostic_counters(self):
+        counters = sorted(self._clip_flush_stats.items())
+        counters.extend((
+            ('bytes_sent', self._bus.sent_bytes),
+            ('duplicates_dropped', self._duplicates_dropped),
+            ('superseded', self._bus.superseded),
+            ('transfers_dropped', self._framer.dropped_transfers),
+            ('ticks_skipped', self._scheduler.skipped_ticks),
+            ('tasks_deferred', self._scheduler.deferred_tasks),
+            ('state_version', self._journal.version),
+            ('selections_coalesced', self._coalesced_selections),
+        ))
+        if self._network is not None:
+            counters.extend((
+                ('network_clients', len(self._network_sessions)),
+                ('network_bytes', self._network.sent_bytes),
+                ('network_clients_dropped', self._network.dropped_clients),
+            ))
+        return counters
+
+    def _setup_sysex_handlers(self):
+        # incoming command id -> handler taking the values of the message
+        self._sysex_handlers = {
+            FIRE_CLIP_COMMAND: self._on_fire_clip_command,
+            DELETE_CLIP_COMMAND: self._on_delete_clip_command,
+            COPY_CLIP_COMMAND: self._on_copy_clip_command,
+            RESYNC_COMMAND: self._on_resync_command,
+            HELLO_COMMAND: self._on_hello,
+            CHUNK_ACK_COMMAND: self._on_chunk_ack_command,
+            CHUNK_RESEND_COMMAND: self._on_chunk_resend_command,
+            SET_SESSION_RING_COMMAND: self._on_session_ring_command,
+            PLAYBACK_PROGRESS_COMMAND: self._on_playback_progress_command,
+            METER_COMMAND: self._on_meter_command,
+            BATCH_COMMAND: self._on_batch_command,
+            RESYNC_SINCE_COMMAND: self._on_resync_since_command,
+            DEVICE_CHAINS_COMMAND: self._on_device_chains_command,
+            DIAGNOSTICS_COMMAND: self._on_diagnostics_command,
+            RECORD_COMMAND: self._on_record_command,
+            CLIP_NOTES_COMMAND: self._on_clip_notes_command,
+            SCENE_METADATA_COMMAND: self._on_scene_metadata_command,
+            CLIP_METADATA_COMMAND: self._on_clip_metadata_command,
+        }
+        for command, handler in list(self._sysex_handlers.items()):
+            self._sysex_handlers[command] = self._diagnostics.wrap('sysex {:02X}'.format(command), handler)
+        # operations allowed in a batch -> (handler, number of 14 bit arguments)
+        self._batch_operations = {
+            FIRE_CLIP_COMMAND: (self._fire_clip, 3),
+            DELETE_CLIP_COMMAND: (self._delete_clip, 2),
+            COPY_CLIP_COMMAND: (self._copy_paste_clip, 4),
+        }
 
     def handle_sysex(self, message):
-        # start stop clip
-        if len(message) >= 2 and message[1] == 9:
-            values = self.extract_values_from_sysex_message(message)
-            if len(values) == 3:
-                self._fire_clip(values[0], values[1], values[2])
-        # delete clip
-        if len(message) >= 2 and message[1] == 10:
-            values = self.extract_values_from_sysex_message(message)
-            if len(values) == 2:
-                self._delete_clip(values[0], values[1])
-        # copy paste clip
-        if len(message) >= 2 and message[1] == 11:
-            values = self.extract_values_from_sysex_message(message)
-            if len(values) == 4:
-                self._copy_paste_clip(values[0], values[1], values[2], values[3])
-
-
+        self._handle_command(message, self._midi_session)
+
+    def _handle_command(self, message, session):
+        if self._recorder.recording:
+            self._recorder.record_sysex(message)
+        if self._pending_selections:
+            self._apply_pending_selections()
+        if len(message) < 2:
+            return
+        handler = self._sysex_handlers.get(message[1])
+        if handler is None:
+            return
+        # answers go to this session only, changes the command makes go to every app
+        self._command_session = session
+        try:
+            handler(self.extract_values_from_sysex_message(message))
+        finally:
+            self._command_session = None
+
+    # start stop clip
+    def _on_fire_clip_command(self, values):
+        if len(values) == 3:
+            self._fire_clip(values[0], values[1], values[2])
+
+    # delete clip
+    def _on_delete_clip_command(self, values):
+        if len(values) == 2:
+            self._delete_clip(values[0], values[1])
+
+    # copy paste clip
+    def _on_copy_clip_command(self, values):
+        if len(values) == 4:
+            self._copy_paste_clip(values[0], values[1], values[2], values[3])
+
+    # full resync requested by the app
+    def _on_resync_command(self, values):
+        self._resync(self._command_session)
+
+    # resync since: session id (14 bit) and the last version the app applied (28 bit)
+    def _on_resync_since_command(self, values):
+        if len(values) == 6:
+            version = (decode_14bit(values[2], values[3]) << 14) | decode_14bit(values[4], values[5])
+            self._resync_since(self._command_session, decode_14bit(values[0], values[1]), version)
+
+    # device chains: path to a rack on the selected track as 14 bit indices
+    def _on_device_chains_command(self, values):
+        if values and len(values) % 2 == 0:
+            with self._sending_to([self._command_session]):
+                self._send_device_chains([decode_14bit(values[index], values[index + 1])
+                                          for index in range(0, len(values), 2)])
+
+    # diagnostics: 0 off, 1 on with an optional log digest period in seconds (14 bit), 2 report, 3 reset
+    def _on_diagnostics_command(self, values):
+        if not values:
+            return
+        if values[0] == 0:
+            self._set_diagnostics(False)
+        elif values[0] == 1:
+            self._set_diagnostics(True, decode_14bit(values[1], values[2]) if len(values) == 3 else 0)
+        elif values[0] == 2:
+            self._send_sys_ex_message(self._diagnostics.report(self._diagnostic_counters()), DIAGNOSTICS_MESSAGE,
+                                      [self._command_session])
+        elif values[0] == 3:
+            self._diagnostics.reset()
+
+    # traffic recording: 1 starts a new recording, 0 stops it
+    def _on_record_command(self, values):
+        if values:
+            self._set_recording(values[0] == 1)
+
+    # detail clip notes: 1 streams them, starting with a dump, 0 stops
+    def _on_clip_notes_command(self, values):
+        if values:
+            self._set_clip_notes_streaming(values[0] == 1)
+
+    # scene metadata: offset and count (14 bit), at most METADATA_PAGE_LIMIT scenes are answered
+    def _on_scene_metadata_command(self, values):
+        if len(values) == 4:
+            offset = decode_14bit(values[0], values[1])
+            count = min(decode_14bit(values[2], values[3]), METADATA_PAGE_LIMIT)
+            with self._sending_to([self._command_session]):
+                self._send_scene_metadata(range(offset, offset + count))
+
+    # clip metadata: track, offset and count of the clip slots (14 bit)
+    def _on_clip_metadata_command(self, values):
+        if len(values) == 6:
+            offset = decode_14bit(values[2], values[3])
+            count = min(decode_14bit(values[4], values[5]), METADATA_PAGE_LIMIT)
+            with self._sending_to([self._command_session]):
+                self._send_clip_metadata(decode_14bit(values[0], values[1]), range(offset, offset + count))
+
+    # chunked transfers, MIDI only: ack with the transfer id, resend with transfer id and 14 bit chunk indices
+    def _on_chunk_ack_command(self, values):
+        if len(values) == 1 and self._command_session is self._midi_session:
+            self._framer.acknowledge(values[0])
+
+    def _on_chunk_resend_command(self, values):
+        if len(values) >= 3 and self._command_session is self._midi_session:
+            chunk_indices = [decode_14bit(values[index], values[index + 1]) for index in range(1, len(values) - 1, 2)]
+            self._framer.retransmit(values[0], chunk_indices)
+
+    # session ring: track offset, scene offset, width and height as 14 bit, 0 for all
+    def _on_session_ring_command(self, values):
+        if len(values) == 8:
+            self._set_session_ring(*[decode_14bit(values[index], values[index + 1]) for index in range(0, 8, 2)])
+
+    # playback progress stream, rate in Hz or 0 for off
+    def _on_playback_progress_command(self, values):
+        if len(values) == 1:
+            self._set_playback_progress_rate(values[0])
+
+    # meters: rate in Hz (0 for off), first track and track count (14 bit), 1 to include returns and master
+    def _on_meter_command(self, values):
+        if len(values) == 6:
+            self._set_meters(values[0], decode_14bit(values[1], values[2]), decode_14bit(values[3], values[4]),
+                             values[5] == 1)
+
+    # batch: any number of operations, each the command id followed by its arguments as 14 bit
+    def _on_batch_command(self, values):
+        applied = 0
+        rejected = 0
+        position = 0
+        while position < len(values):
+            operation = self._batch_operations.get(values[position])
+            if operation is None:
+                # without a known operation the rest can't be parsed
+                rejected += 1
+                break
+            handler, argument_count = operation
+            end = position + 1 + 2 * argument_count
+            if end > len(values):
+                rejected += 1
+                break
+            arguments = [decode_14bit(values[index], values[index + 1]) for index in range(position + 1, end, 2)]
+            if handler(*arguments):
+                applied += 1
+            else:
+                rejected += 1
+            position = end
+        # one grid update for the whole batch instead of waiting for the next tick
+        self._flush_clip_slots()
+        self._send_sys_ex_message(encode_14bit(applied) + encode_14bit(rejected), BATCH_RESULT_MESSAGE,
+                                  [self._command_session])
 
     def extract_values_from_sysex_message(self, message):
         # Extract the values from the SysEx message based on the message format
@@ -633,9 +1994,22 @@ class MicroPush(ControlSurface):
         values = message[2:-1]
         return values
 
+    def _clip_slot_at(self, track_index, clip_index):
+        # None instead of an IndexError for anything the app got wrong
+        tracks = self.song().tracks
+        if not 0 <= track_index < len(tracks):
+            self.log_message("Invalid track index: {}".format(track_index))
+            return None
+        clip_slots = tracks[track_index].clip_slots
+        if not 0 <= clip_index < len(clip_slots):
+            self.log_message("Invalid clip index: {}".format(clip_index))
+            return None
+        return clip_slots[clip_index]
+
     def _fire_clip(self, fire, track_index, clip_index):
-        track = self.song().tracks[track_index]
-        clip_slot = track.clip_slots[clip_index]
+        clip_slot = self._clip_slot_at(track_index, clip_index)
+        if clip_slot is None:
+            return False
         if fire == 1:
             if clip_slot.is_playing:
                 clip_slot.stop()
@@ -643,22 +2017,22 @@ class MicroPush(ControlSurface):
                 clip_slot.set_fire_button_state(1)
         # else:
             # create new clip
+        return True
 
     def _delete_clip(self, track_index, clip_index):
-        track = self.song().tracks[track_index]
-        clip_slot = track.clip_slots[clip_index]
+        clip_slot = self._clip_slot_at(track_index, clip_index)
+        if clip_slot is None:
+            return False
         clip_slot.delete_clip()
+        return True
 
     def _copy_paste_clip(self, from_track, from_clip, to_track, to_clip):
-        tracks = self.song().tracks
-
-        copy_track = tracks[from_track]
-        copy_clip_slot = copy_track.clip_slots[from_clip]
-
-        paste_track = tracks[to_track]
-        paste_clip_slot = paste_track.clip_slots[to_clip]
-
+        copy_clip_slot = self._clip_slot_at(from_track, from_clip)
+        paste_clip_slot = self._clip_slot_at(to_track, to_clip)
+        if copy_clip_slot is None or paste_clip_slot is None or not copy_clip_slot.has_clip:
+            return False
         copy_clip_slot.duplicate_clip_to(paste_clip_slot)
+        return True
 
     def _fire_scene(self, value):
         scenes = self.song().scenes
@@ -668,8 +2042,9 @@ class MicroPush(ControlSurface):
 
     def _select_clip_scene(self, value):
         scenes = self.song().scenes
-        if value < len(scenes):
-            self.song().view.selected_scene = scenes[value]
+        if value >= len(scenes):
+            return
+        self.song().view.selected_scene = scenes[value]
         track = self.song().view.selected_track
         if value < len(track.clip_slots):
             self.song().view.highlighted_clip_slot = track.clip_slots[value]
@@ -679,26 +2054,30 @@ class MicroPush(ControlSurface):
         self.song().delete_scene(value)
 
     def _on_selected_scene_changed(self):
-        selected_scene = self.song().view.selected_scene
-        scenes_list = self.song().scenes
-        new_index = self._find_track_index(selected_scene, scenes_list)
-        self._send_selected_clip_slot(new_index)
+        new_index = self._scene_indices.index(self.song().view.selected_scene)
+        self._send_selected_clip_slot(new_index if new_index is not None else "not found")
 
     def _send_selected_clip_slot(self, clip_index):
         self._send_sys_ex_message(str(clip_index), 0x10)
 
     def disconnect(self):
-        capture_button.remove_value_listener(self._capture_button_value)
-        quantize_button.remove_value_listener(self._quantize_button_value)
-        duplicate_button.remove_value_listener(self._duplicate_button_value)
-        duplicate_scene_button.remove_value_listener(self._duplicate_scene_button_value)
-        sesh_record_button.remove_value_listener(self._sesh_record_value)
-        redo_button.remove_value_listener(self._redo_button_value)
-        undo_button.remove_value_listener(self._undo_button_value)
-        # periodic_check_button.remove_value_listener(self._periodic_check)
-        self.song().remove_tracks_listener(self._on_tracks_changed)
+        self._scheduler.disconnect()
+        self._recorder.stop()
+        for button, callback in self._button_listeners:
+            button.remove_value_listener(callback)
+        self._button_listeners = []
+        self._pending_selections = {}
+        for event, callback in self._song_listeners:
+            getattr(self.song(), 'remove_' + event + '_listener')(callback)
+        self._track_listeners.disconnect()
         # self.song().view.remove_selected_track_listener(self._on_selected_track_changed)
         self._unregister_clip_listeners()
-        self.remove_midi_listener(self._midi_listener)
+        self._parameter_listeners.disconnect()
+        self._device_chains.disconnect()
+        self._set_clip_notes_streaming(False)
+        self._metadata_rows.disconnect()
+        if self._network is not None:
+            self._network.disconnect()
+            self._network = None
         # self.song().view.remove_selected_scene_listener(self._on_selected_scene_changed)
         super(MicroPush, self).disconnect()
@@ -0,0 +1,82 @@
+# MicroPush
+# Single way out for all MIDI the script sends to the app.
+
+from collections import deque
+
+# priority classes, highest first
+INTERACTIVE = 0
+STATE = 1
+BULK = 2
+
+# bytes sent per display tick before messages wait for the next one
+DEFAULT_BYTE_BUDGET = 4096
+
+
+class OutboundBus(object):
+    """
+    Interactive feedback always goes out right away. State and bulk messages
+    go out right away too while nothing is waiting and the byte budget of the
+    tick allows it, otherwise they are queued and sent by `pump`, state
+    before bulk. A queued bulk message is replaced when a newer one with the
+    same key is sent before it went out. While bulk messages wait, state
+    messages queue up behind them, so the bus never lets a delta overtake a
+    dump it queued earlier. Chunked transfers are ordered by the framer
+    before they reach the bus.
+    """
+
+    def __init__(self, send_midi, byte_budget=DEFAULT_BYTE_BUDGET):
+        self._send_midi = send_midi
+        self._byte_budget = byte_budget
+        self._spent = 0
+        self._state_queue = deque()
+        self._bulk_queue = deque()
+        self.sent_bytes = 0
+        self.superseded = 0
+
+    def reset(self):
+        self._state_queue.clear()
+        self._bulk_queue.clear()
+
+    def has_pending(self):
+        return bool(self._state_queue or self._bulk_queue)
+
+    def send(self, midi_bytes, priority=STATE, key=None):
+        if priority == INTERACTIVE:
+            self._emit(midi_bytes)
+        elif not self.has_pending() and self._spent + len(midi_bytes) <= self._byte_budget:
+            self._emit(midi_bytes)
+        elif priority == BULK or self._bulk_queue:
+            if priority == BULK and key is not None:
+                self._supersede(key)
+            self._bulk_queue.append((key, priority, midi_bytes))
+        else:
+            self._state_queue.append((key, priority, midi_bytes))
+
+    def pump(self):
+        budget = self._byte_budget - self._spent
+        sent_any = False
+        for queue in (self._state_queue, self._bulk_queue):
+            while queue:
+                midi_bytes = queue[0][2]
+                # a message larger than the whole budget still goes out once nothing else did
+                if len(midi_bytes) > budget and sent_any:
+                    break
+                queue.popleft()
+                self._emit(midi_bytes)
+                budget -= len(midi_bytes)
+                sent_any = True
+            if queue:
+                break
+        self._spent = 0
+
+    def _supersede(self, key):
+        for entry in self._bulk_queue:
+            if entry[0] == key and entry[1] == BULK:
+                self._bulk_queue.remove(entry)
+                self.superseded += 1
+                return
+
+    def _emit(self, midi_bytes):
+        self._spent += len(midi_bytes)
+        self.sent_bytes += len(midi_bytes)
+        self._send_midi(midi_bytes)
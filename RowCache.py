@@ -0,0 +1,61 @@
+# MicroPush
+
+from collections import OrderedDict
+
+from .ListenerRegistry import ListenerRegistry
+
+
+class RowCache(object):
+    """
+    Encoded rows the app fetched, by key, each with listeners on the Live
+    objects it shows. A notification outdates the row and reports its key to
+    `on_invalidate`. Past `limit` rows, the least recently fetched one is
+    dropped along with its listeners.
+    """
+
+    def __init__(self, on_invalidate=None, limit=512):
+        self._on_invalidate = on_invalidate
+        self._limit = limit
+        # key -> [row or None once outdated, number of subjects listened to]
+        self._rows = OrderedDict()
+        self._listeners = ListenerRegistry()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def get(self, key):
+        entry = self._rows.get(key)
+        if entry is None:
+            return None
+        self._rows.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, row, subjects):
+        """ Stores `row`, outdated by any of the events on its subjects, given as (subject, events) pairs. """
+        self._drop(key)
+        self._rows[key] = [row, len(subjects)]
+        invalidate = lambda: self.invalidate(key)
+        for index, (subject, events) in enumerate(subjects):
+            self._listeners.register((key, index), subject, events, invalidate)
+        while len(self._rows) > self._limit:
+            self._drop(next(iter(self._rows)))
+
+    def invalidate(self, key):
+        # runs from Live notifications, the listeners stay until the row is put again or dropped
+        entry = self._rows.get(key)
+        if entry is not None and entry[0] is not None:
+            entry[0] = None
+            if self._on_invalidate is not None:
+                self._on_invalidate(key)
+
+    def clear(self):
+        self._listeners.disconnect()
+        self._rows = OrderedDict()
+
+    disconnect = clear
+
+    def _drop(self, key):
+        entry = self._rows.pop(key, None)
+        if entry is not None:
+            for index in range(entry[1]):
+                self._listeners.unregister((key, index))
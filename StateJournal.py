@@ -0,0 +1,41 @@
+# MicroPush
+
+import random
+from collections import deque
+
+
+class StateJournal(object):
+    """
+    Ring buffer of the state messages sent to the app, each stamped with a
+    monotonically increasing version. An app that saw version N can get
+    everything after it replayed, as long as those messages are still in
+    the journal. The session id changes every time the script is loaded,
+    so versions of an earlier session are never mistaken for current ones.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=256 * 1024):
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._entries = deque()
+        self._size = 0
+        self.version = 0
+        self.session_id = random.randint(0, (1 << 14) - 1)
+
+    def record(self, message_id, payload):
+        self.version += 1
+        self._entries.append((self.version, message_id, payload))
+        self._size += len(payload)
+        while self._entries and (len(self._entries) > self._max_entries or self._size > self._max_bytes):
+            self._size -= len(self._entries.popleft()[2])
+        return self.version
+
+    def since(self, session_id, version):
+        """ Returns the (message id, payload) pairs recorded after `version`, or None if they are not all known anymore. """
+        if session_id != self.session_id or version > self.version:
+            return None
+        if version == self.version:
+            return []
+        if not self._entries or self._entries[0][0] > version + 1:
+            return None
+        return [(message_id, payload) for entry_version, message_id, payload in self._entries
+                if entry_version > version]
@@ -0,0 +1,49 @@
+# MicroPush
+
+from .SysexCodec import encode_14bit, pack_values
+
+# ids are sent as 14 bit
+MAX_STRINGS = 1 << 14
+
+
+class StringTable(object):
+    """
+    Session scoped table of strings already sent to the app. Every string is
+    defined once with a short id, later messages only refer to that id. The
+    table starts over when it is full or the app reconnects.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._undefined = []
+
+    def reset(self):
+        self._ids = {}
+        self._undefined = []
+
+    def is_full(self):
+        return len(self._ids) >= MAX_STRINGS
+
+    def intern(self, text):
+        string_id = self._ids.get(text)
+        if string_id is None:
+            string_id = self._ids[text] = len(self._ids)
+            self._undefined.append((string_id, text))
+        return string_id
+
+    def take_definitions(self):
+        """
+        Encodes the strings interned since the last call: count, then id,
+        byte length and the UTF-8 bytes packed into 7-bit bytes per string.
+        Returns None when there is nothing new.
+        """
+        if not self._undefined:
+            return None
+        payload = bytearray(encode_14bit(len(self._undefined)))
+        for string_id, text in self._undefined:
+            data = text.encode('utf-8')
+            payload.extend(encode_14bit(string_id))
+            payload.extend(encode_14bit(len(data)))
+            payload.extend(pack_values(bytearray(data), 8))
+        self._undefined = []
+        return payload
@@ -0,0 +1,104 @@
+# MicroPush
+# Helpers for binary sysex payloads. Every byte they produce is 7-bit safe.
+
+CLIP_GRID_FORMAT_VERSION = 1
+# bits used per clip slot: hasClip, isPlaying, isRecording, isTriggered
+CLIP_STATE_BITS = 4
+# clip note start and duration are sent in ticks of 1/NOTE_TIME_RESOLUTION beat
+NOTE_TIME_RESOLUTION = 480
+
+
+def encode_14bit(value):
+    return ((value >> 7) & 0x7F, value & 0x7F)
+
+
+def decode_14bit(msb, lsb):
+    return ((msb & 0x7F) << 7) | (lsb & 0x7F)
+
+
+def encode_28bit(value):
+    return ((value >> 21) & 0x7F, (value >> 14) & 0x7F, (value >> 7) & 0x7F, value & 0x7F)
+
+
+def pack_values(values, bits):
+    """ Packs unsigned values of the given bit width into a stream of 7-bit bytes, most significant bit first. """
+    packed = bytearray()
+    accumulator = 0
+    accumulated_bits = 0
+    for value in values:
+        accumulator = (accumulator << bits) | value
+        accumulated_bits += bits
+        while accumulated_bits >= 7:
+            accumulated_bits -= 7
+            packed.append((accumulator >> accumulated_bits) & 0x7F)
+        accumulator &= (1 << accumulated_bits) - 1
+    if accumulated_bits:
+        packed.append((accumulator << (7 - accumulated_bits)) & 0x7F)
+    return packed
+
+
+def encode_clip_grid(states):
+    """
+    Version byte, track count and scene count (14 bit each), then one
+    nibble per slot, track by track, packed into 7-bit bytes.
+    """
+    scene_count = max(len(track_states) for track_states in states) if states else 0
+    payload = bytearray((CLIP_GRID_FORMAT_VERSION,))
+    payload.extend(encode_14bit(len(states)))
+    payload.extend(encode_14bit(scene_count))
+
+    def slot_values():
+        for track_states in states:
+            for state in track_states:
+                yield state
+            for _ in range(scene_count - len(track_states)):
+                yield 0
+
+    payload.extend(pack_values(slot_values(), CLIP_STATE_BITS))
+    return payload
+
+
+def encode_clip_delta(changes):
+    """ Version byte and change count, then track (14 bit), scene (14 bit) and state per change. """
+    payload = bytearray((CLIP_GRID_FORMAT_VERSION,))
+    payload.extend(encode_14bit(len(changes)))
+    for track_index, scene_index, state in changes:
+        payload.extend(encode_14bit(track_index))
+        payload.extend(encode_14bit(scene_index))
+        payload.append(state & 0x7F)
+    return payload
+
+
+def _append_notes(payload, notes):
+    for note_id, (pitch, start, duration, velocity, mute) in notes:
+        payload.extend(encode_28bit(note_id))
+        payload.append(pitch & 0x7F)
+        payload.extend(encode_28bit(start))
+        payload.extend(encode_28bit(duration))
+        payload.append(velocity & 0x7F)
+        payload.append(1 if mute else 0)
+
+
+def encode_clip_notes(generation, page_index, page_count, notes):
+    """
+    Generation, page index, page count and note count (14 bit each), then per
+    note its id (28 bit), pitch, start and duration (28 bit ticks), velocity
+    and mute flag.
+    """
+    payload = bytearray(encode_14bit(generation))
+    payload.extend(encode_14bit(page_index))
+    payload.extend(encode_14bit(page_count))
+    payload.extend(encode_14bit(len(notes)))
+    _append_notes(payload, notes)
+    return payload
+
+
+def encode_note_diff(generation, removed_ids, notes):
+    """ Generation, removed count (14 bit) and ids (28 bit), then added or changed notes as in encode_clip_notes. """
+    payload = bytearray(encode_14bit(generation))
+    payload.extend(encode_14bit(len(removed_ids)))
+    for note_id in removed_ids:
+        payload.extend(encode_28bit(note_id))
+    payload.extend(encode_14bit(len(notes)))
+    _append_notes(payload, notes)
+    return payload
@@ -0,0 +1,160 @@
+# MicroPush
+# Splits large sysex payloads into numbered chunks and streams them a few per tick.
+
+from collections import deque
+
+from .SysexCodec import encode_14bit
+
+# message id of a chunk frame
+CHUNK_MESSAGE = 0x15
+# payload bytes per chunk, keeps every frame below 256 bytes
+DEFAULT_CHUNK_SIZE = 200
+DEFAULT_CHUNKS_PER_TICK = 4
+# transfers waiting to be sent; past that the oldest one not started yet is
+# dropped, the gap in transfer ids tells the app to resync. Well below the 128
+# transfer ids, so a queued transfer never shares its id with another
+DEFAULT_MAX_QUEUED = 64
+
+
+def chunk_checksum(data):
+    checksum = 0
+    for byte in data:
+        checksum ^= byte
+    return checksum & 0x7F
+
+
+class _Transfer(object):
+
+    def __init__(self, transfer_id, message_id, payload, chunk_size):
+        self.transfer_id = transfer_id
+        self.message_id = message_id
+        self.chunks = [payload[offset:offset + chunk_size] for offset in range(0, len(payload), chunk_size)] or [payload]
+        self.pending = deque(range(len(self.chunks)))
+        self.sent_tick = None
+        self.retries = 0
+        self.key = None
+
+
+class SysexFramer(object):
+    """
+    Chunk frames carry the transfer id, the id of the wrapped message, the
+    chunk index and chunk count (14 bit each), an XOR checksum of the chunk
+    data and then the data itself.
+
+    Without acknowledgements a transfer is forgotten once its last chunk is
+    out. With acknowledgements it is kept until the app acks it, chunks the
+    app reports missing are sent again, and a transfer that is not acked in
+    time is resent as a whole a limited number of times. Resends go ahead of
+    everything queued; at most `window` transfers wait for an ack at once,
+    which only holds back transfers that were never sent.
+    """
+
+    def __init__(self, send_frame, chunk_size=DEFAULT_CHUNK_SIZE, chunks_per_tick=DEFAULT_CHUNKS_PER_TICK,
+                 ack_timeout=20, max_retries=3, window=4, max_queued=DEFAULT_MAX_QUEUED):
+        self._send_frame = send_frame
+        self._chunk_size = chunk_size
+        self._chunks_per_tick = chunks_per_tick
+        self._ack_timeout = ack_timeout
+        self._max_retries = max_retries
+        self._window = window
+        self._max_queued = max_queued
+        self._acknowledged = False
+        self._next_transfer_id = 0
+        self._queue = deque()
+        self._unacked = {}
+        self._tick_count = 0
+        self.dropped_transfers = 0
+
+    def set_acknowledged(self, acknowledged):
+        self._acknowledged = acknowledged
+
+    def reset(self):
+        self._queue.clear()
+        self._unacked.clear()
+
+    def has_pending(self):
+        return bool(self._queue)
+
+    def should_frame(self, size, ordered=True):
+        # while any transfer is pending, small ordered messages go through the
+        # queue too, otherwise a delta could overtake the dump it applies to
+        return size > self._chunk_size or (ordered and self.has_pending())
+
+    def send(self, message_id, payload, key=None):
+        """ A transfer with the same `key` that has not started yet is replaced by this one. """
+        if key is not None:
+            for queued in self._queue:
+                if queued.key == key and queued.sent_tick is None and len(queued.pending) == len(queued.chunks):
+                    self._queue.remove(queued)
+                    break
+        transfer = _Transfer(self._next_transfer_id, message_id, payload, self._chunk_size)
+        transfer.key = key
+        self._next_transfer_id = (self._next_transfer_id + 1) & 0x7F
+        if transfer.transfer_id in self._unacked:
+            # the id wrapped around while the app still owes us an ack
+            del self._unacked[transfer.transfer_id]
+            self.dropped_transfers += 1
+        if len(self._queue) >= self._max_queued:
+            self._drop_oldest_unsent()
+        self._queue.append(transfer)
+
+    def pump(self):
+        self._tick_count += 1
+        if self._acknowledged:
+            self._check_timeouts()
+        budget = self._chunks_per_tick
+        while budget and self._queue:
+            transfer = self._queue[0]
+            if not transfer.pending:
+                self._queue.popleft()
+                continue
+            if self._acknowledged and transfer.sent_tick is None and transfer.transfer_id not in self._unacked \
+                    and len(self._unacked) >= self._window:
+                break
+            self._send_chunk(transfer, transfer.pending.popleft())
+            budget -= 1
+            if not transfer.pending:
+                self._queue.popleft()
+                transfer.sent_tick = self._tick_count
+                if self._acknowledged:
+                    self._unacked[transfer.transfer_id] = transfer
+
+    def acknowledge(self, transfer_id):
+        self._unacked.pop(transfer_id, None)
+
+    def retransmit(self, transfer_id, chunk_indices):
+        transfer = self._unacked.get(transfer_id)
+        if transfer is None:
+            return
+        missing = [index for index in chunk_indices if 0 <= index < len(transfer.chunks)]
+        if missing and transfer not in self._queue:
+            transfer.pending.extend(missing)
+            self._queue.appendleft(transfer)
+
+    def _check_timeouts(self):
+        for transfer_id, transfer in list(self._unacked.items()):
+            if transfer in self._queue or self._tick_count - transfer.sent_tick < self._ack_timeout:
+                continue
+            if transfer.retries >= self._max_retries:
+                del self._unacked[transfer_id]
+                self.dropped_transfers += 1
+                continue
+            transfer.retries += 1
+            transfer.pending.extend(range(len(transfer.chunks)))
+            # ahead of the transfers the window holds back, or it would never free up
+            self._queue.appendleft(transfer)
+
+    def _drop_oldest_unsent(self):
+        for queued in self._queue:
+            if queued.sent_tick is None and len(queued.pending) == len(queued.chunks):
+                self._queue.remove(queued)
+                self.dropped_transfers += 1
+                return
+
+    def _send_chunk(self, transfer, chunk_index):
+        data = transfer.chunks[chunk_index]
+        header = bytearray((transfer.transfer_id, transfer.message_id))
+        header.extend(encode_14bit(chunk_index))
+        header.extend(encode_14bit(len(transfer.chunks)))
+        header.append(chunk_checksum(data))
+        self._send_frame(header + data, CHUNK_MESSAGE)
@@ -0,0 +1,83 @@
+# MicroPush
+
+import time
+
+# Live calls update_display roughly every 100 ms
+TICK_PERIOD = 0.1
+
+
+class _Task(object):
+
+    def __init__(self, name, callback, interval):
+        self.name = name
+        self.callback = callback
+        self.interval = interval
+        self.next_tick = 0
+
+
+class TickScheduler(object):
+    """
+    Runs periodic tasks on Live's main thread, driven by the control
+    surface's update_display tick. Intervals are given in ticks.
+
+    Tasks never catch up on missed runs. If a tick arrives late because the
+    main thread is behind, that tick is skipped entirely (but never two in a
+    row), and once a tick has used up its time budget the remaining due tasks
+    wait for the next tick.
+    """
+
+    def __init__(self, log_message=None, tick_budget=0.02, late_factor=2.5, diagnostics=None):
+        self._log_message = log_message
+        self._diagnostics = diagnostics
+        self._tick_budget = tick_budget
+        self._late_threshold = TICK_PERIOD * late_factor
+        self._tasks = []
+        self._tick_count = 0
+        self._last_tick_time = None
+        self._skipped_last_tick = False
+        self._running = True
+        self.skipped_ticks = 0
+        self.deferred_tasks = 0
+
+    def add_task(self, name, callback, interval=1):
+        self.remove_task(name)
+        if self._diagnostics is not None:
+            callback = self._diagnostics.wrap('task ' + name, callback)
+        task = _Task(name, callback, max(1, int(interval)))
+        task.next_tick = self._tick_count + 1
+        self._tasks.append(task)
+
+    def remove_task(self, name):
+        self._tasks = [task for task in self._tasks if task.name != name]
+
+    def tick(self):
+        if not self._running:
+            return
+        now = time.time()
+        late = self._last_tick_time is not None and now - self._last_tick_time > self._late_threshold
+        self._last_tick_time = now
+        if late and not self._skipped_last_tick:
+            self._skipped_last_tick = True
+            self.skipped_ticks += 1
+            return
+        self._skipped_last_tick = False
+        self._tick_count += 1
+        # most overdue first, so deferred tasks are not starved
+        due = sorted((task for task in self._tasks if task.next_tick <= self._tick_count),
+                     key=lambda task: task.next_tick)
+        for index, task in enumerate(due):
+            if index > 0 and time.time() - now > self._tick_budget:
+                self.deferred_tasks += len(due) - index
+                break
+            task.next_tick = self._tick_count + task.interval
+            try:
+                task.callback()
+            except Exception as exception:
+                if self._log_message:
+                    self._log_message("Task {} failed: {}".format(task.name, exception))
+            if not self._running:
+                break
+
+    def disconnect(self):
+        self._running = False
+        self._tasks = []
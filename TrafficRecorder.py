@@ -0,0 +1,122 @@
+# MicroPush
+# Records the MIDI going in and out of the script to a compact binary log.
+
+import os
+import struct
+import time
+
+RECORDING_MAGIC = b'MPRC'
+RECORDING_VERSION = 2
+
+# record kinds
+INBOUND_SYSEX = 0
+INBOUND_CONTROL = 1
+OUTBOUND = 2
+
+# magic, version, then track, scene and return track count of the set
+_HEADER = struct.Struct('<4sBHHH')
+# kind, microseconds since the recording started, length of the data
+_RECORD = struct.Struct('<BQI')
+
+
+class TrafficRecorder(object):
+    """
+    Records are appended to a buffer in memory; `flush` writes the buffer
+    out and is meant to run from a periodic task, so file writes never
+    happen while a message is handled.
+
+    Inbound sysex and outbound MIDI are stored as sent, inbound controls as
+    message type, channel, identifier and value.
+
+    A record or write that fails stops the recording and is logged, the
+    traffic it was recording goes on as if nothing was recorded.
+    """
+
+    def __init__(self, log_message=None):
+        self._log_message = log_message
+        self.recording = False
+        self.path = None
+        self._file = None
+        self._buffer = bytearray()
+        self._start = 0.0
+        self.records = 0
+
+    def start(self, path, track_count, scene_count, return_count):
+        self.stop()
+        self._file = open(path, 'wb')
+        self._file.write(_HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION, track_count, scene_count, return_count))
+        self.path = path
+        self.records = 0
+        self._start = time.perf_counter()
+        self.recording = True
+
+    def stop(self):
+        if self._file is None:
+            return
+        self.recording = False
+        self.flush()
+        self._file.close()
+        self._file = None
+
+    def record_sysex(self, message):
+        self._record(INBOUND_SYSEX, message)
+
+    def record_control(self, message_type, channel, identifier, value):
+        self._record(INBOUND_CONTROL, (message_type, channel, identifier, value))
+
+    def record_outbound(self, midi_bytes):
+        self._record(OUTBOUND, midi_bytes)
+
+    def flush(self):
+        if self._file is not None and self._buffer:
+            try:
+                self._file.write(self._buffer)
+                self._file.flush()
+            except (IOError, OSError) as error:
+                self._fail(error)
+                return
+            self._buffer = bytearray()
+
+    def _record(self, kind, data):
+        timestamp = int((time.perf_counter() - self._start) * 1e6)
+        try:
+            record = _RECORD.pack(kind, timestamp, len(data)) + bytes(bytearray(data))
+        except (struct.error, TypeError, ValueError) as error:
+            self._fail(error)
+            return
+        self._buffer.extend(record)
+        self.records += 1
+
+    def _fail(self, error):
+        self.recording = False
+        self._buffer = bytearray()
+        if self._file is not None:
+            try:
+                self._file.close()
+            except (IOError, OSError):
+                pass
+            self._file = None
+        if self._log_message:
+            self._log_message("Recording stopped after {} messages: {}".format(self.records, error))
+
+
+def default_recording_path(directory=None):
+    directory = directory or os.path.expanduser('~')
+    return os.path.join(directory, time.strftime('MicroPush-%Y%m%d-%H%M%S.mprc'))
+
+
+def read_recording(path):
+    """ Returns the (track count, scene count, return count) of the set and a list of (kind, microseconds, data). """
+    with open(path, 'rb') as recording:
+        content = recording.read()
+    magic, version, track_count, scene_count, return_count = _HEADER.unpack_from(content, 0)
+    if magic != RECORDING_MAGIC or version != RECORDING_VERSION:
+        raise ValueError('{} is not a MicroPush recording'.format(path))
+    records = []
+    offset = _HEADER.size
+    while offset + _RECORD.size <= len(content):
+        kind, timestamp, length = _RECORD.unpack_from(content, offset)
+        offset += _RECORD.size
+        records.append((kind, timestamp, bytearray(content[offset:offset + length])))
+        offset += length
+    return (track_count, scene_count, return_count), records
@@ -0,0 +1,290 @@
+# MicroPush
+# Non-blocking WebSocket server carrying the sysex messages to apps on the network.
+
+import base64
+import errno
+import hashlib
+import hmac
+import socket
+import struct
+
+WEBSOCKET_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC11B65'
+
+OPCODE_CONTINUATION = 0x0
+OPCODE_BINARY = 0x2
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+# a handshake larger than this is not a WebSocket client
+MAX_HANDSHAKE_SIZE = 8192
+# largest message a client may send, in one frame or fragmented; commands are
+# a few bytes, a batch of thousands of operations still fits
+MAX_MESSAGE_SIZE = 1 << 16
+RECEIVE_SIZE = 65536
+# bytes buffered per client, reading waits for them to be handled beyond that
+MAX_BUFFERED_BYTES = MAX_MESSAGE_SIZE + RECEIVE_SIZE
+
+_WOULD_BLOCK = (errno.EAGAIN, errno.EWOULDBLOCK, getattr(errno, 'WSAEWOULDBLOCK', errno.EWOULDBLOCK))
+
+
+def encode_frame(opcode, payload):
+    header = bytearray((0x80 | opcode, ))
+    length = len(payload)
+    if length < 126:
+        header.append(length)
+    elif length < 1 << 16:
+        header.append(126)
+        header.extend(struct.pack('>H', length))
+    else:
+        header.append(127)
+        header.extend(struct.pack('>Q', length))
+    return bytes(header) + bytes(payload)
+
+
+def accept_key(key):
+    return base64.b64encode(hashlib.sha1(key + WEBSOCKET_GUID).digest())
+
+
+class _Client(object):
+
+    def __init__(self, connection, address):
+        self.connection = connection
+        self.address = address
+        self.open = False
+        self.received = bytearray()
+        self.fragments = None
+        self.outgoing = bytearray()
+
+
+class WebSocketTransport(object):
+    """
+    Serves WebSocket clients, up to `max_clients`, without ever blocking
+    Live's main thread: `poll` accepts connections, reads what arrived and
+    writes what is queued, and is meant to run every display tick.
+
+    Every binary frame holds one message: its id followed by the same
+    payload the sysex message carries. Messages are sent to one client at a
+    time, and messages from a client are passed to `handle_message` along
+    with it. `on_open` and `on_close` are called with a client once its
+    handshake is done and once it is gone. A client whose queue grows past
+    `max_queued_bytes` can't keep up and is dropped; it gets everything
+    again with a resync after reconnecting.
+
+    Only this computer can connect unless `host` says otherwise. With a
+    `token`, the handshake has to ask for a path with `?token=<token>`.
+    """
+
+    def __init__(self, port, host='127.0.0.1', token=None, max_clients=4, max_queued_bytes=1 << 20,
+                 on_open=None, on_close=None, log_message=None):
+        self._port = port
+        self._host = host
+        self._token = token.encode('utf-8') if token is not None else None
+        self._max_clients = max_clients
+        self._max_queued_bytes = max_queued_bytes
+        self._on_open = on_open
+        self._on_close = on_close
+        self._log_message = log_message
+        self._server = None
+        self._clients = []
+        self.sent_bytes = 0
+        self.dropped_clients = 0
+
+    def start(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind((self._host, self._port))
+        server.listen(self._max_clients)
+        server.setblocking(False)
+        self._server = server
+
+    @property
+    def port(self):
+        return self._server.getsockname()[1] if self._server is not None else self._port
+
+    def has_clients(self):
+        return any(client.open for client in self._clients)
+
+    def send(self, client, message_id, payload):
+        if not client.open:
+            return
+        frame = encode_frame(OPCODE_BINARY, bytearray((message_id, )) + bytearray(payload))
+        if len(client.outgoing) + len(frame) > self._max_queued_bytes:
+            self._drop(client, 'send queue full')
+            return
+        client.outgoing.extend(frame)
+        self._write(client)
+
+    def poll(self, handle_message):
+        if self._server is None:
+            return
+        self._accept()
+        for client in list(self._clients):
+            self._read(client, handle_message)
+            if client in self._clients and client.outgoing:
+                self._write(client)
+
+    def disconnect(self):
+        for client in list(self._clients):
+            self._close(client)
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+
+    def _accept(self):
+        while True:
+            try:
+                connection, address = self._server.accept()
+            except socket.error as error:
+                if error.args and error.args[0] not in _WOULD_BLOCK:
+                    self._log('accept failed: {}'.format(error))
+                return
+            if len(self._clients) >= self._max_clients:
+                connection.close()
+                continue
+            connection.setblocking(False)
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._clients.append(_Client(connection, address))
+
+    def _read(self, client, handle_message):
+        while len(client.received) < MAX_BUFFERED_BYTES:
+            try:
+                data = client.connection.recv(RECEIVE_SIZE)
+            except socket.error as error:
+                if error.args and error.args[0] in _WOULD_BLOCK:
+                    break
+                self._drop(client, str(error))
+                return
+            if not data:
+                self._close(client)
+                return
+            client.received.extend(data)
+        if not client.open:
+            self._handshake(client)
+        if client.open:
+            self._read_frames(client, handle_message)
+
+    def _handshake(self, client):
+        end = client.received.find(b'\r\n\r\n')
+        if end < 0:
+            if len(client.received) > MAX_HANDSHAKE_SIZE:
+                self._drop(client, 'handshake too large')
+            return
+        request = bytes(client.received[:end]).split(b'\r\n')
+        del client.received[:end + 4]
+        if self._token is not None and not self._authorized(request[0]):
+            client.outgoing.extend(b'HTTP/1.1 403 Forbidden\r\nContent-Length: 0\r\n\r\n')
+            self._write(client)
+            self._drop(client, 'wrong token')
+            return
+        key = None
+        for line in request[1:]:
+            name, _, value = line.partition(b':')
+            if name.strip().lower() == b'sec-websocket-key':
+                key = value.strip()
+        if key is None:
+            self._drop(client, 'not a WebSocket request')
+            return
+        client.outgoing.extend(b'HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                               b'Sec-WebSocket-Accept: ' + accept_key(key) + b'\r\n\r\n')
+        client.open = True
+        self._write(client)
+        self._log('client {} connected'.format(client.address[0]))
+        if self._on_open is not None:
+            self._on_open(client)
+
+    def _authorized(self, request_line):
+        # GET /path?token=... HTTP/1.1
+        parts = request_line.split(b' ')
+        query = parts[1].partition(b'?')[2] if len(parts) == 3 else b''
+        for parameter in query.split(b'&'):
+            name, _, value = parameter.partition(b'=')
+            if name == b'token' and hmac.compare_digest(value, self._token):
+                return True
+        return False
+
+    def _read_frames(self, client, handle_message):
+        received = client.received
+        while len(received) >= 2:
+            opcode = received[0] & 0x0F
+            final = received[0] & 0x80
+            masked = received[1] & 0x80
+            length = received[1] & 0x7F
+            offset = 2
+            if length == 126:
+                if len(received) < 4:
+                    return
+                length = struct.unpack('>H', bytes(received[2:4]))[0]
+                offset = 4
+            elif length == 127:
+                if len(received) < 10:
+                    return
+                length = struct.unpack('>Q', bytes(received[2:10]))[0]
+                offset = 10
+            if not masked or length > MAX_MESSAGE_SIZE:
+                self._drop(client, 'invalid frame')
+                return
+            if len(received) < offset + 4 + length:
+                return
+            mask = received[offset:offset + 4]
+            payload = bytearray(byte ^ mask[index & 3]
+                                for index, byte in enumerate(received[offset + 4:offset + 4 + length]))
+            del received[:offset + 4 + length]
+            if opcode == OPCODE_CLOSE:
+                client.outgoing.extend(encode_frame(OPCODE_CLOSE, b''))
+                self._write(client)
+                self._close(client)
+                return
+            if opcode == OPCODE_PING:
+                client.outgoing.extend(encode_frame(OPCODE_PONG, payload))
+                continue
+            if opcode == OPCODE_BINARY:
+                client.fragments = payload
+            elif opcode == OPCODE_CONTINUATION and client.fragments is not None:
+                if len(client.fragments) + len(payload) > MAX_MESSAGE_SIZE:
+                    self._drop(client, 'message too large')
+                    return
+                client.fragments.extend(payload)
+            else:
+                # text and pong frames carry nothing for us
+                continue
+            if final:
+                message = client.fragments
+                client.fragments = None
+                if message:
+                    handle_message(client, message)
+                    if not client.open:
+                        # dropped while its message was handled
+                        return
+
+    def _write(self, client):
+        try:
+            sent = client.connection.send(client.outgoing)
+        except socket.error as error:
+            if error.args and error.args[0] in _WOULD_BLOCK:
+                return
+            self._drop(client, str(error))
+            return
+        self.sent_bytes += sent
+        del client.outgoing[:sent]
+
+    def _drop(self, client, reason):
+        self.dropped_clients += 1
+        self._log('dropped client {}: {}'.format(client.address[0], reason))
+        self._close(client)
+
+    def _close(self, client):
+        if client in self._clients:
+            self._clients.remove(client)
+        was_open = client.open
+        client.open = False
+        try:
+            client.connection.close()
+        except socket.error:
+            pass
+        if was_open and self._on_close is not None:
+            self._on_close(client)
+
+    def _log(self, message):
+        if self._log_message:
+            self._log_message(message)
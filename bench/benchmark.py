@@ -0,0 +1,232 @@
+# MicroPush
+# Times the hot paths of the script on synthetic sets, outside of Live.
+#
+#   python bench/benchmark.py
+#   python bench/benchmark.py --sizes 8x8,512x1000 --repeat 3 --capabilities 15 --only clip
+
+from __future__ import print_function
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+import harness
+
+DEFAULT_SIZES = '8x8,64x128,128x256,512x1000'
+# pumps of the framer and bus before the messages of a run are given up on
+DRAIN_LIMIT = 10000
+
+# (name, setup) in the order they run, setup(context) returns (prepare, run)
+SCENARIOS = []
+
+
+def scenario(name):
+
+    def decorator(setup):
+        SCENARIOS.append((name, setup))
+        return setup
+
+    return decorator
+
+
+class Context(object):
+
+    def __init__(self, surface, song, c_instance):
+        self.surface = surface
+        self.song = song
+        self.c_instance = c_instance
+        self.step = 0
+
+    def slot(self):
+        # walks through the set so every run touches another slot
+        self.step += 1
+        tracks = self.song.tracks
+        track = tracks[(self.step * 7) % len(tracks)]
+        return track.clip_slots[(self.step * 13) % len(track.clip_slots)]
+
+
+def _nothing():
+    pass
+
+
+@scenario('_update_clip_slots full')
+def _update_clip_slots_full(context):
+    # an unchanged grid would be dropped as duplicate
+    return context.surface._midi_session.forget, lambda: context.surface._update_clip_slots(force_full=True)
+
+
+def _toggle_clip(slot):
+    if slot.has_clip:
+        slot.delete_clip()
+    else:
+        slot.create_clip()
+
+
+@scenario('_update_clip_slots delta')
+def _update_clip_slots_delta(context):
+    return lambda: _toggle_clip(context.slot()), context.surface._update_clip_slots
+
+
+@scenario('_update_mixer_and_tracks')
+def _update_mixer_and_tracks(context):
+    return context.surface._midi_session.forget, context.surface._update_mixer_and_tracks
+
+
+@scenario('_register_clip_listeners')
+def _register_clip_listeners(context):
+    return context.surface._unregister_clip_listeners, context.surface._register_clip_listeners
+
+
+@scenario('handle_sysex resync')
+def _handle_sysex_resync(context):
+    return _nothing, lambda: context.surface.handle_sysex((0xF0, 0x0C, 0xF7))
+
+
+@scenario('handle_sysex fire clip')
+def _handle_sysex_fire_clip(context):
+    return _nothing, lambda: context.surface.handle_sysex((0xF0, 0x09, 1, 0, 0, 0xF7))
+
+
+@scenario('handle_sysex batch of 64')
+def _handle_sysex_batch(context):
+    song = context.song
+    message = [0xF0, 0x13]
+    for index in range(64):
+        track_index = index % len(song.tracks)
+        scene_index = (index * 3) % len(song.scenes)
+        message.append(0x09)
+        for value in (1, track_index, scene_index):
+            message.extend(((value >> 7) & 0x7F, value & 0x7F))
+    message.append(0xF7)
+    return _nothing, lambda: context.surface.handle_sysex(tuple(message))
+
+
+@scenario('tick idle')
+def _tick_idle(context):
+    return _nothing, lambda: harness.tick(context.surface)
+
+
+@scenario('tick after 16 clip changes')
+def _tick_after_changes(context):
+
+    def prepare():
+        for _ in range(16):
+            _toggle_clip(context.slot())
+
+    return prepare, lambda: harness.tick(context.surface)
+
+
+# last, the fresh surface it leaves has neither the hello nor the ring of the other scenarios
+@scenario('create_instance')
+def _create_instance(context):
+
+    def prepare():
+        context.surface.disconnect()
+
+    def run():
+        context.surface = harness.load_package().create_instance(context.c_instance)
+
+    return prepare, run
+
+
+def _drain(surface):
+    # messages still waiting for their tick are part of what the run sent; transfers
+    # are acked like the app would, and a queue that never empties is given up on
+    framer = surface._framer
+    for _ in range(DRAIN_LIMIT):
+        for transfer_id in list(framer._unacked):
+            framer.acknowledge(transfer_id)
+        if not framer.has_pending() and not surface._bus.has_pending():
+            return
+        framer.pump()
+        surface._bus.pump()
+    print('gave up draining after {} pumps'.format(DRAIN_LIMIT))
+
+
+def measure(context, setup, repeat):
+    prepare, run = setup(context)
+    times = []
+    sent_bytes = 0
+    messages = 0
+    for _ in range(repeat):
+        prepare()
+        _drain(context.surface)
+        del context.c_instance.sent[:]
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+        _drain(context.surface)
+        sent_bytes = context.c_instance.sent_bytes()
+        messages = len(context.c_instance.sent)
+    # allocations in a separate run, tracing slows everything down
+    prepare()
+    _drain(context.surface)
+    gc.collect()
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    run()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    _drain(context.surface)
+    return {
+        'best': min(times) * 1000.0,
+        'mean': sum(times) * 1000.0 / len(times),
+        'peak_kb': (peak - base) / 1024.0,
+        'retained_kb': (current - base) / 1024.0,
+        'bytes': sent_bytes,
+        'messages': messages,
+    }
+
+
+def parse_sizes(text):
+    sizes = []
+    for size in text.split(','):
+        tracks, scenes = size.lower().split('x')
+        sizes.append((int(tracks), int(scenes)))
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the MicroPush hot paths on synthetic sets.')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='comma separated TRACKSxSCENES')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--capabilities', type=int, default=0,
+                        help='capability flags to request with a hello first, 0 keeps the ascii formats')
+    parser.add_argument('--ring', help='session ring WIDTHxHEIGHT to set first, the whole song otherwise')
+    parser.add_argument('--devices', type=int, default=2, help='devices per track')
+    parser.add_argument('--only', help='only run scenarios containing this text')
+    args = parser.parse_args()
+
+    row = '{:>10} {:<28} {:>10} {:>10} {:>10} {:>10} {:>10} {:>6}'
+    print(row.format('set', 'scenario', 'best ms', 'mean ms', 'peak KB', 'kept KB', 'bytes', 'msgs'))
+    for track_count, scene_count in parse_sizes(args.sizes):
+        start = time.perf_counter()
+        surface, song, c_instance = harness.make(track_count=track_count, scene_count=scene_count,
+                                                 devices_per_track=args.devices)
+        context = Context(surface, song, c_instance)
+        if args.capabilities:
+            surface.handle_sysex((0xF0, 0x0D, 1, (args.capabilities >> 7) & 0x7F, args.capabilities & 0x7F, 0xF7))
+        if args.ring:
+            width, height = (int(value) for value in args.ring.lower().split('x'))
+            surface._set_session_ring(0, 0, width, height)
+        harness.tick(surface, 3)
+        _drain(surface)
+        print('{:>10} {:<28} {:>10.1f}'.format('{}x{}'.format(track_count, scene_count), '(building the set)',
+                                              (time.perf_counter() - start) * 1000.0))
+        for name, setup in SCENARIOS:
+            if args.only and args.only not in name:
+                continue
+            result = measure(context, setup, args.repeat)
+            print(row.format('{}x{}'.format(track_count, scene_count), name, '{:.3f}'.format(result['best']),
+                             '{:.3f}'.format(result['mean']), '{:.1f}'.format(result['peak_kb']),
+                             '{:.1f}'.format(result['retained_kb']), result['bytes'], result['messages']))
+        failures = [line for line in c_instance.log if 'failed' in line]
+        if failures:
+            print('{} task failures, first: {}'.format(len(failures), failures[0]))
+        context.surface.disconnect()
+
+
+if __name__ == '__main__':
+    main()
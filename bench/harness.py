@@ -0,0 +1,63 @@
+# MicroPush
+# Runs the script outside of Live, against the stand-ins in bench/stubs.
+
+import importlib
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PACKAGE_DIR = os.path.dirname(BENCH_DIR)
+
+sys.path.insert(0, os.path.join(BENCH_DIR, 'stubs'))
+
+import Live
+
+
+class CInstance(object):
+    """ What Live hands to create_instance, collecting the MIDI the script sends and its log. """
+
+    def __init__(self, song):
+        self._song = song
+        self.sent = []
+        self.log = []
+
+    def song(self):
+        return self._song
+
+    def send_midi(self, midi_bytes):
+        # Live refuses anything that isn't valid MIDI, so should we
+        if any(not 0 <= byte < 256 for byte in midi_bytes):
+            raise ValueError('not a MIDI byte in {}'.format(midi_bytes))
+        if midi_bytes[0] == 0xF0 and any(byte > 0x7F for byte in midi_bytes[1:-1]):
+            raise ValueError('sysex data byte above 0x7F in {}'.format(midi_bytes))
+        self.sent.append(tuple(midi_bytes))
+
+    def sent_bytes(self):
+        return sum(len(midi_bytes) for midi_bytes in self.sent)
+
+    def log_message(self, message):
+        self.log.append(message)
+
+    def request_rebuild_midi_map(self):
+        pass
+
+
+def load_package():
+    parent, name = os.path.split(PACKAGE_DIR)
+    if parent not in sys.path:
+        sys.path.insert(0, parent)
+    return importlib.import_module(name)
+
+
+def make(**song_kwargs):
+    """ Returns the control surface, the song and the c_instance for a new song, see Live.Song for the arguments. """
+    song = Live.Song(**song_kwargs)
+    c_instance = CInstance(song)
+    return load_package().create_instance(c_instance), song, c_instance
+
+
+def tick(surface, count=1):
+    """ Calls update_display like Live does every 100 ms, without the scheduler skipping late ticks. """
+    for _ in range(count):
+        surface._scheduler._last_tick_time = None
+        surface.update_display()
@@ -0,0 +1,140 @@
+# MicroPush
+# Connects WebSocket clients over loopback to the script running on the stand-ins.
+#
+#   python bench/loopback.py
+#   python bench/loopback.py --clients 3 --tracks 128 --scenes 256 --capabilities 15
+
+from __future__ import print_function
+
+import argparse
+import base64
+import importlib
+import os
+import socket
+import struct
+import time
+
+import harness
+
+TIMEOUT = 0.05
+
+
+class LoopbackClient(object):
+    """ Blocking WebSocket client, reading whatever the server sent after each tick. """
+
+    def __init__(self, port):
+        self.socket = socket.create_connection(('127.0.0.1', port))
+        self.received = bytearray()
+        self.messages = []
+        self.bytes = 0
+        key = base64.b64encode(os.urandom(16))
+        self.socket.sendall(b'GET / HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                            b'Sec-WebSocket-Key: ' + key + b'\r\nSec-WebSocket-Version: 13\r\n\r\n')
+        self.handshaken = False
+
+    def send(self, message):
+        mask = os.urandom(4)
+        payload = bytearray(byte ^ mask[index & 3] for index, byte in enumerate(bytearray(message)))
+        header = bytearray((0x82, ))
+        if len(payload) < 126:
+            header.append(0x80 | len(payload))
+        else:
+            header.append(0x80 | 126)
+            header.extend(struct.pack('>H', len(payload)))
+        self.socket.sendall(bytes(header) + mask + bytes(payload))
+
+    def read(self):
+        self.socket.settimeout(TIMEOUT)
+        while True:
+            try:
+                data = self.socket.recv(65536)
+            except socket.timeout:
+                break
+            if not data:
+                break
+            self.bytes += len(data)
+            self.received.extend(data)
+        if not self.handshaken:
+            end = self.received.find(b'\r\n\r\n')
+            if end < 0:
+                return
+            assert self.received.startswith(b'HTTP/1.1 101'), bytes(self.received[:end])
+            del self.received[:end + 4]
+            self.handshaken = True
+        while len(self.received) >= 2:
+            length = self.received[1] & 0x7F
+            offset = 2
+            if length == 126:
+                length = struct.unpack('>H', bytes(self.received[2:4]))[0]
+                offset = 4
+            elif length == 127:
+                length = struct.unpack('>Q', bytes(self.received[2:10]))[0]
+                offset = 10
+            if len(self.received) < offset + length:
+                return
+            self.messages.append(bytes(self.received[offset:offset + length]))
+            del self.received[:offset + length]
+
+    def close(self):
+        self.socket.close()
+
+
+def exchange(surface, clients, ticks=1):
+    for _ in range(ticks):
+        harness.tick(surface)
+        for client in clients:
+            client.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Runs MicroPush with its WebSocket server and loopback clients.')
+    parser.add_argument('--clients', type=int, default=2)
+    parser.add_argument('--tracks', type=int, default=64)
+    parser.add_argument('--scenes', type=int, default=128)
+    parser.add_argument('--capabilities', type=int, default=0,
+                        help='capability flags for the hello, 0 keeps the ascii formats')
+    args = parser.parse_args()
+
+    package = harness.load_package()
+    # any free port
+    importlib.import_module(package.__name__ + '.MicroPush').NETWORK_PORT = 0
+    surface, song, c_instance = harness.make(track_count=args.tracks, scene_count=args.scenes)
+    port = surface._network.port
+    clients = [LoopbackClient(port) for _ in range(args.clients)]
+    while not all(client.handshaken for client in clients):
+        exchange(surface, clients)
+    del c_instance.sent[:]
+
+    start = time.perf_counter()
+    capabilities = args.capabilities
+    clients[0].send((0x0D, 1, (capabilities >> 7) & 0x7F, capabilities & 0x7F))
+    exchange(surface, clients, 2)
+    elapsed = time.perf_counter() - start
+    # the hello and its resync only go to the client that sent it
+    for index, client in enumerate(clients):
+        ids = sorted(set(message[0] for message in client.messages))
+        print('client {}: {} messages, {} bytes, ids {}'.format(index, len(client.messages), client.bytes,
+                                                               ' '.join('{:02X}'.format(i) for i in ids)))
+    print('hello and resync in {:.1f} ms, {} sysex messages on MIDI meanwhile'.format(
+        elapsed * 1000.0, sum(1 for message in c_instance.sent if message[0] == 0xF0)))
+
+    before = [len(client.messages) for client in clients]
+    del c_instance.sent[:]
+    slot = next(slot for slot in song.tracks[0].clip_slots if not slot.has_clip)
+    slot.create_clip()
+    exchange(surface, clients, 3)
+    print('clip change reached MIDI as {} message(s), the clients as {}'.format(
+        sum(1 for message in c_instance.sent if message[0] == 0xF0),
+        ', '.join(str(len(client.messages) - count) for client, count in zip(clients, before))))
+
+    for client in clients:
+        client.close()
+    # closed sockets are noticed on the next poll
+    time.sleep(TIMEOUT)
+    exchange(surface, [])
+    print('clients still connected after closing: {}'.format(surface._network.has_clients()))
+    surface.disconnect()
+
+
+if __name__ == '__main__':
+    main()
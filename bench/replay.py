@@ -0,0 +1,95 @@
+# MicroPush
+# Replays a traffic recording against the script running on the stand-ins.
+#
+#   python bench/replay.py ~/MicroPush-20240101-200000.mprc
+#   python bench/replay.py recording.mprc --speed 0 --tracks 64 --scenes 128
+
+from __future__ import print_function
+
+import argparse
+import importlib
+import time
+
+import harness
+
+TICK_MICROSECONDS = 100000
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Feeds a MicroPush traffic recording back into the script.')
+    parser.add_argument('recording')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='1 replays in real time, 2 twice as fast, 0 as fast as possible')
+    parser.add_argument('--tracks', type=int, help='tracks in the set, as recorded by default')
+    parser.add_argument('--scenes', type=int, help='scenes in the set, as recorded by default')
+    parser.add_argument('--returns', type=int, help='return tracks in the set, as recorded by default')
+    args = parser.parse_args()
+
+    package = harness.load_package()
+    recorder = importlib.import_module(package.__name__ + '.TrafficRecorder')
+    (track_count, scene_count, return_count), records = recorder.read_recording(args.recording)
+    surface, song, c_instance = harness.make(track_count=args.tracks or track_count,
+                                             scene_count=args.scenes or scene_count,
+                                             return_count=return_count if args.returns is None else args.returns)
+    buttons = dict(((button.message_type(), button.message_channel(), button.message_identifier()), button)
+                   for button, _ in surface._button_listeners)
+    del c_instance.sent[:]
+
+    latencies = {}
+    tick_times = []
+    recorded_bytes = recorded_messages = 0
+    next_tick = TICK_MICROSECONDS
+    start = time.perf_counter()
+    for kind, timestamp, data in records:
+        if kind == recorder.OUTBOUND:
+            recorded_bytes += len(data)
+            recorded_messages += 1
+            continue
+        # display ticks the script would have seen until this message
+        while next_tick <= timestamp:
+            tick_start = time.perf_counter()
+            harness.tick(surface)
+            tick_times.append(time.perf_counter() - tick_start)
+            next_tick += TICK_MICROSECONDS
+        if args.speed:
+            delay = start + timestamp / 1e6 / args.speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        if kind == recorder.INBOUND_SYSEX:
+            name = 'sysex {:02X}'.format(data[1]) if len(data) > 1 else 'sysex'
+            command_start = time.perf_counter()
+            surface.handle_sysex(tuple(data))
+        else:
+            button = buttons.get(tuple(data[:3]))
+            if button is None:
+                continue
+            name = 'control {}/{}/{}'.format(data[0], data[1], data[2])
+            command_start = time.perf_counter()
+            button.receive_value(data[3])
+        latencies.setdefault(name, []).append(time.perf_counter() - command_start)
+    harness.tick(surface)
+    elapsed = time.perf_counter() - start
+
+    commands = sum(len(values) for values in latencies.values())
+    print('{} commands in {:.3f} s, {:.0f} commands/s'.format(commands, elapsed, commands / elapsed if elapsed else 0))
+    row = '{:<24} {:>8} {:>10} {:>10} {:>10}'
+    print(row.format('command', 'count', 'mean ms', 'p95 ms', 'max ms'))
+    for name, values in sorted(latencies.items()):
+        print(row.format(name, len(values), '{:.3f}'.format(sum(values) * 1000.0 / len(values)),
+                         '{:.3f}'.format(percentile(values, 0.95) * 1000.0), '{:.3f}'.format(max(values) * 1000.0)))
+    if tick_times:
+        print(row.format('(display ticks)', len(tick_times), '{:.3f}'.format(sum(tick_times) * 1000.0 / len(tick_times)),
+                         '{:.3f}'.format(percentile(tick_times, 0.95) * 1000.0),
+                         '{:.3f}'.format(max(tick_times) * 1000.0)))
+    print('sent {} bytes in {} messages, recorded {} bytes in {} messages'.format(
+        c_instance.sent_bytes(), len(c_instance.sent), recorded_bytes, recorded_messages))
+    surface.disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,426 @@
+# MicroPush
+# Stand-in for Live's Python API, modelling just enough of a song to run the script offline.
+
+import itertools
+
+_pointers = itertools.count(1)
+
+
+class LiveObject(object):
+    """
+    Names listed in `_listenable` get the usual add_x_listener,
+    remove_x_listener and x_has_listener methods, and assigning them notifies
+    the listeners. Deleted objects turn invalid like they do in Live.
+    """
+
+    _listenable = ()
+
+    def __init__(self):
+        object.__setattr__(self, '_live_ptr', next(_pointers))
+        object.__setattr__(self, '_listeners', {})
+        object.__setattr__(self, '_deleted', False)
+
+    def _delete(self):
+        object.__setattr__(self, '_deleted', True)
+        self._listeners.clear()
+
+    def __bool__(self):
+        return not self._deleted
+
+    __nonzero__ = __bool__
+
+    def __setattr__(self, name, value):
+        changed = name in self._listenable and getattr(self, name, None) != value
+        object.__setattr__(self, name, value)
+        if changed:
+            self.notify(name)
+
+    def __getattr__(self, name):
+        for prefix, suffix, method in (('add_', '_listener', self._add_listener),
+                                       ('remove_', '_listener', self._remove_listener),
+                                       ('', '_has_listener', self._has_listener)):
+            if name.startswith(prefix) and name.endswith(suffix):
+                prop = name[len(prefix):-len(suffix)]
+                if prop in self._listenable:
+                    return lambda callback: method(prop, callback)
+        raise AttributeError(name)
+
+    def _add_listener(self, prop, callback):
+        listeners = self._listeners.setdefault(prop, [])
+        if callback in listeners:
+            raise RuntimeError('Listener already connected')
+        listeners.append(callback)
+
+    def _remove_listener(self, prop, callback):
+        listeners = self._listeners.get(prop, [])
+        if callback not in listeners:
+            raise RuntimeError('Listener not connected')
+        listeners.remove(callback)
+
+    def _has_listener(self, prop, callback):
+        return callback in self._listeners.get(prop, [])
+
+    def listener_count(self, prop=None):
+        if prop is not None:
+            return len(self._listeners.get(prop, []))
+        return sum(len(listeners) for listeners in self._listeners.values())
+
+    def notify(self, prop):
+        for callback in list(self._listeners.get(prop, [])):
+            callback()
+
+    def __eq__(self, other):
+        return isinstance(other, LiveObject) and self._live_ptr == other._live_ptr
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return self._live_ptr
+
+
+class MidiMap(object):
+
+    class MapMode(object):
+        absolute = 0
+        absolute_14_bit = 1
+        relative_signed_bit = 2
+
+
+class DeviceParameter(LiveObject):
+    _listenable = ('value', 'name')
+
+    def __init__(self, name, value=0.0, min=0.0, max=1.0):
+        LiveObject.__init__(self)
+        self.name = name
+        self.min = min
+        self.max = max
+        self.value = value
+        self.is_quantized = False
+
+
+class Chain(LiveObject):
+    _listenable = ('devices', 'name')
+
+    def __init__(self, name, devices=()):
+        LiveObject.__init__(self)
+        self.name = name
+        self.devices = tuple(devices)
+
+
+class Device(LiveObject):
+    _listenable = ('name', 'parameters', 'chains')
+
+    def __init__(self, name, parameter_count=8, chains=()):
+        LiveObject.__init__(self)
+        self.name = name
+        self.class_name = name
+        self.parameters = tuple([DeviceParameter('Device On', 1.0)] +
+                                [DeviceParameter('{} {}'.format(name, index + 1), 0.5)
+                                 for index in range(parameter_count)])
+        self.chains = tuple(chains)
+        self.can_have_chains = bool(chains)
+
+
+class Note(object):
+
+    def __init__(self, pitch, start_time, duration, velocity=100, mute=False, note_id=None):
+        self.pitch = pitch
+        self.start_time = start_time
+        self.duration = duration
+        self.velocity = velocity
+        self.mute = mute
+        self.probability = 1.0
+        self.velocity_deviation = 0.0
+        self.release_velocity = 64
+        self.note_id = note_id
+
+
+class Clip(LiveObject):
+    _listenable = ('name', 'color', 'color_index', 'playing_position', 'playing_status', 'notes')
+
+    def __init__(self, name='', color=0xFF0000, color_index=0, length=4.0, is_midi_clip=True):
+        LiveObject.__init__(self)
+        self.name = name
+        self.color = color
+        self.color_index = color_index
+        self.length = length
+        self.loop_start = 0.0
+        self.loop_end = length
+        self.playing_position = 0.0
+        self.is_midi_clip = is_midi_clip
+        self.is_playing = False
+        self.is_recording = False
+        self._notes = {}
+        self._note_ids = itertools.count(1)
+
+    def quantize(self, grid, strength):
+        modifications = self.get_notes_extended(0, 128, 0.0, self.length)
+        for note in modifications:
+            note.start_time = round(note.start_time * 4) / 4.0
+        self.apply_note_modifications(modifications)
+
+    def add_new_notes(self, specifications):
+        ids = []
+        for spec in specifications:
+            note_id = next(self._note_ids)
+            self._notes[note_id] = Note(spec.pitch, spec.start_time, spec.duration, spec.velocity,
+                                        spec.mute, note_id)
+            ids.append(note_id)
+        self.notify('notes')
+        return ids
+
+    def get_notes_extended(self, from_pitch, pitch_span, from_time, time_span):
+        return tuple(Note(n.pitch, n.start_time, n.duration, n.velocity, n.mute, n.note_id)
+                     for n in self._notes.values()
+                     if from_pitch <= n.pitch < from_pitch + pitch_span
+                     and from_time <= n.start_time < from_time + time_span)
+
+    def get_all_notes_extended(self):
+        return self.get_notes_extended(0, 128, -1e9, 2e9)
+
+    def remove_notes_by_id(self, note_ids):
+        for note_id in note_ids:
+            self._notes.pop(note_id, None)
+        self.notify('notes')
+
+    def apply_note_modifications(self, notes):
+        for note in notes:
+            if note.note_id in self._notes:
+                self._notes[note.note_id] = Note(note.pitch, note.start_time, note.duration,
+                                                 note.velocity, note.mute, note.note_id)
+        self.notify('notes')
+
+
+class ClipSlot(LiveObject):
+    _listenable = ('has_clip', 'is_triggered', 'playing_status', 'color')
+
+    def __init__(self, track):
+        LiveObject.__init__(self)
+        self.canonical_parent = track
+        self.clip = None
+        self.has_clip = False
+        self.is_triggered = False
+        self.has_stop_button = True
+
+    @property
+    def is_playing(self):
+        return self.clip is not None and self.clip.is_playing
+
+    @property
+    def is_recording(self):
+        return self.clip is not None and self.clip.is_recording
+
+    def create_clip(self, length=4.0, name=''):
+        self.clip = Clip(name=name, length=length)
+        self.has_clip = True
+        return self.clip
+
+    def delete_clip(self):
+        if self.clip is not None:
+            self.clip._delete()
+        self.clip = None
+        self.has_clip = False
+
+    def fire(self, force_legato=False):
+        if self.clip is not None:
+            self.clip.is_playing = True
+            self.notify('playing_status')
+            self.clip.notify('playing_status')
+        self.is_triggered = True
+
+    def set_fire_button_state(self, state):
+        if state:
+            self.fire()
+
+    def stop(self):
+        if self.clip is not None:
+            self.clip.is_playing = False
+            self.notify('playing_status')
+            self.clip.notify('playing_status')
+        self.is_triggered = False
+
+    def duplicate_clip_to(self, other):
+        if self.clip is not None:
+            other.clip = Clip(name=self.clip.name, color=self.clip.color,
+                              color_index=self.clip.color_index, length=self.clip.length)
+            other.has_clip = True
+
+
+class TrackView(LiveObject):
+    _listenable = ('selected_device',)
+
+    def __init__(self):
+        LiveObject.__init__(self)
+        self.selected_device = None
+
+
+class MixerDevice(LiveObject):
+
+    def __init__(self):
+        LiveObject.__init__(self)
+        self.volume = DeviceParameter('Volume', 0.85)
+        self.panning = DeviceParameter('Pan', 0.0, -1.0, 1.0)
+        self.sends = ()
+
+
+class Track(LiveObject):
+    _listenable = ('name', 'color', 'color_index', 'mute', 'solo', 'arm', 'implicit_arm',
+                   'devices', 'clip_slots', 'output_meter_left', 'output_meter_right',
+                   'output_meter_level', 'playing_slot_index', 'fired_slot_index')
+
+    def __init__(self, name, scene_count=0, color=0x3366CC, color_index=0, devices=(),
+                 has_midi_input=True, can_be_armed=True):
+        LiveObject.__init__(self)
+        self.name = name
+        self.color = color
+        self.color_index = color_index
+        self.mute = False
+        self.solo = False
+        self.arm = False
+        self.implicit_arm = False
+        self.can_be_armed = can_be_armed
+        self.has_midi_input = has_midi_input
+        self.has_audio_output = True
+        self.output_meter_left = 0.0
+        self.output_meter_right = 0.0
+        self.output_meter_level = 0.0
+        self.playing_slot_index = -1
+        self.fired_slot_index = -1
+        self.devices = tuple(devices)
+        self.clip_slots = tuple(ClipSlot(self) for _ in range(scene_count))
+        self.view = TrackView()
+        self.mixer_device = MixerDevice()
+
+    def duplicate_clip_slot(self, index):
+        self.clip_slots[index].duplicate_clip_to(self.clip_slots[index + 1])
+        return index + 1
+
+
+class Scene(LiveObject):
+    _listenable = ('name', 'color', 'color_index', 'is_triggered')
+
+    def __init__(self, name='', color=0, color_index=0):
+        LiveObject.__init__(self)
+        self.name = name
+        self.color = color
+        self.color_index = color_index
+        self.is_triggered = False
+        self.song = None
+
+    def fire(self):
+        index = list(self.song.scenes).index(self)
+        for track in self.song.tracks:
+            track.clip_slots[index].fire()
+
+
+class SongView(LiveObject):
+    _listenable = ('selected_track', 'selected_scene', 'detail_clip', 'highlighted_clip_slot',
+                   'selected_chain')
+
+    def __init__(self, song):
+        LiveObject.__init__(self)
+        self._song = song
+        self.selected_track = None
+        self.selected_scene = None
+        self.detail_clip = None
+        self.highlighted_clip_slot = None
+
+    def select_device(self, device):
+        for track in tuple(self._song.tracks) + tuple(self._song.return_tracks) + (self._song.master_track,):
+            if device in track.devices:
+                track.view.selected_device = device
+
+
+class Song(LiveObject):
+    _listenable = ('tracks', 'visible_tracks', 'return_tracks', 'scenes', 'can_undo', 'can_redo',
+                   'session_record', 'is_playing')
+
+    def __init__(self, track_count=8, scene_count=8, return_count=2, devices_per_track=2,
+                 clip_density=0.5):
+        LiveObject.__init__(self)
+        self.can_undo = False
+        self.can_redo = False
+        self.session_record = False
+        self.swing_amount = 0.0
+        self.is_playing = False
+        self.scenes = tuple(self._make_scene(index) for index in range(scene_count))
+        self.tracks = tuple(self._make_track(index, devices_per_track) for index in range(track_count))
+        self.visible_tracks = self.tracks
+        self.return_tracks = tuple(Track('{}-Return'.format(chr(65 + index)), 0, color_index=index,
+                                         has_midi_input=False, can_be_armed=False)
+                                   for index in range(return_count))
+        self.master_track = Track('Master', 0, has_midi_input=False, can_be_armed=False)
+        self.view = SongView(self)
+        self.view.selected_track = self.tracks[0] if self.tracks else self.master_track
+        self.view.selected_scene = self.scenes[0] if self.scenes else None
+        if clip_density:
+            step = max(1, int(round(1.0 / clip_density)))
+            for track_index, track in enumerate(self.tracks):
+                for scene_index, slot in enumerate(track.clip_slots):
+                    if (track_index + scene_index) % step == 0:
+                        slot.create_clip(name='Clip {}.{}'.format(track_index, scene_index))
+
+    def _make_scene(self, index):
+        scene = Scene('Scene {}'.format(index + 1), color_index=index % 70)
+        scene.song = self
+        return scene
+
+    def _make_track(self, index, device_count):
+        devices = [Device('Device {}.{}'.format(index, device_index)) for device_index in range(device_count)]
+        return Track('Track {}'.format(index + 1), len(self.scenes), color=(index * 0x10305) & 0xFFFFFF,
+                     color_index=index % 70, devices=devices)
+
+    # structural edits
+
+    def create_midi_track(self, index=-1):
+        track = self._make_track(len(self.tracks), 1)
+        tracks = list(self.tracks)
+        tracks.insert(len(tracks) if index < 0 else index, track)
+        self.tracks = tuple(tracks)
+        self.visible_tracks = self.tracks
+        return track
+
+    def delete_track(self, index):
+        tracks = list(self.tracks)
+        for slot in tracks[index].clip_slots:
+            slot._delete()
+        tracks[index]._delete()
+        del tracks[index]
+        self.tracks = tuple(tracks)
+        self.visible_tracks = self.tracks
+
+    def create_scene(self, index=-1):
+        scene = self._make_scene(len(self.scenes))
+        position = len(self.scenes) if index < 0 else index
+        for track in self.tracks:
+            slots = list(track.clip_slots)
+            slots.insert(position, ClipSlot(track))
+            track.clip_slots = tuple(slots)
+        scenes = list(self.scenes)
+        scenes.insert(position, scene)
+        self.scenes = tuple(scenes)
+        return scene
+
+    def delete_scene(self, index):
+        for track in self.tracks:
+            slots = list(track.clip_slots)
+            slots[index]._delete()
+            del slots[index]
+            track.clip_slots = tuple(slots)
+        scenes = list(self.scenes)
+        scenes[index]._delete()
+        del scenes[index]
+        self.scenes = tuple(scenes)
+
+    def duplicate_scene(self, index):
+        self.create_scene(index + 1)
+
+    def capture_midi(self):
+        pass
+
+    def undo(self):
+        pass
+
+    def redo(self):
+        pass
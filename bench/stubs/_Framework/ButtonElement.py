@@ -0,0 +1,13 @@
+# MicroPush
+
+from .InputControlElement import InputControlElement
+
+
+class ButtonElement(InputControlElement):
+
+    def __init__(self, is_momentary, msg_type, channel, identifier, *a, **k):
+        InputControlElement.__init__(self, msg_type, channel, identifier)
+        self._is_momentary = bool(is_momentary)
+
+    def is_momentary(self):
+        return self._is_momentary
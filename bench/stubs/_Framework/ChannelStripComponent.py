@@ -0,0 +1,39 @@
+# MicroPush
+
+from .ControlSurfaceComponent import ControlSurfaceComponent
+
+# control assignments made on strips, read by the benchmarks
+rebinds = [0]
+
+
+class ChannelStripComponent(ControlSurfaceComponent):
+
+    def __init__(self, *a, **k):
+        ControlSurfaceComponent.__init__(self)
+        self._track = None
+        self._controls = {}
+
+    def set_track(self, track):
+        self._track = track
+
+    def _set(self, name, control):
+        rebinds[0] += 1
+        self._controls[name] = control
+
+    def set_volume_control(self, control):
+        self._set('volume', control)
+
+    def set_pan_control(self, control):
+        self._set('pan', control)
+
+    def set_send_controls(self, controls):
+        self._set('sends', controls)
+
+    def set_mute_button(self, button):
+        self._set('mute', button)
+
+    def set_solo_button(self, button):
+        self._set('solo', button)
+
+    def set_arm_button(self, button):
+        self._set('arm', button)
@@ -0,0 +1,59 @@
+# MicroPush
+
+from contextlib import contextmanager
+
+from .ControlSurfaceComponent import ControlSurfaceComponent
+
+
+class ControlSurface(object):
+
+    def __init__(self, c_instance, *a, **k):
+        self._c_instance = c_instance
+        self._scheduled_messages = []
+        self._device_component = None
+        ControlSurfaceComponent.song_instance[0] = c_instance.song()
+
+    @contextmanager
+    def component_guard(self):
+        yield
+
+    def song(self):
+        return self._c_instance.song()
+
+    def application(self):
+        return None
+
+    def log_message(self, *message):
+        self._c_instance.log_message(' '.join(str(part) for part in message))
+
+    def show_message(self, message):
+        pass
+
+    def _send_midi(self, midi_event_bytes, optimized=True):
+        self._c_instance.send_midi(midi_event_bytes)
+        return True
+
+    def schedule_message(self, delay_in_ticks, callback, parameter=None):
+        self._scheduled_messages.append([delay_in_ticks, callback, parameter])
+
+    def update_display(self):
+        due = []
+        for message in self._scheduled_messages:
+            message[0] -= 1
+            if message[0] <= 0:
+                due.append(message)
+        for message in due:
+            self._scheduled_messages.remove(message)
+            if message[2] is None:
+                message[1]()
+            else:
+                message[1](message[2])
+
+    def set_device_component(self, device_component):
+        self._device_component = device_component
+
+    def request_rebuild_midi_map(self):
+        self._c_instance.request_rebuild_midi_map()
+
+    def disconnect(self):
+        self._scheduled_messages = []
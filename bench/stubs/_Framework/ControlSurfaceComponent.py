@@ -0,0 +1,17 @@
+# MicroPush
+
+class ControlSurfaceComponent(object):
+    song_instance = [None]
+
+    def __init__(self, *a, **k):
+        self._sub_components = []
+        self.name = ''
+
+    def song(self):
+        return ControlSurfaceComponent.song_instance[0]
+
+    def register_components(self, *components):
+        self._sub_components.extend(components)
+
+    def disconnect(self):
+        pass
@@ -0,0 +1,69 @@
+# MicroPush
+
+from .ControlSurfaceComponent import ControlSurfaceComponent
+
+
+class DeviceComponent(ControlSurfaceComponent):
+
+    def __init__(self, *a, **k):
+        ControlSurfaceComponent.__init__(self)
+        self._device = None
+        self._bank_index = 0
+        self._bank_name = ''
+        self._parameter_controls = []
+        self._device_listeners = []
+
+    def add_device_listener(self, callback):
+        self._device_listeners.append(callback)
+
+    def remove_device_listener(self, callback):
+        self._device_listeners.remove(callback)
+
+    def device_has_listener(self, callback):
+        return callback in self._device_listeners
+
+    def device(self):
+        return self._device
+
+    def set_device(self, device):
+        if device != self._device:
+            self._device = device
+            self._bank_index = 0
+            self._update()
+            for callback in list(self._device_listeners):
+                callback()
+
+    def set_parameter_controls(self, controls):
+        self._parameter_controls = list(controls)
+        self._update()
+
+    def set_bank_nav_buttons(self, left, right):
+        left.add_value_listener(lambda value: value and self._nav(-1))
+        right.add_value_listener(lambda value: value and self._nav(1))
+
+    def _bank_count(self):
+        if self._device is None:
+            return 0
+        return max(1, (len(self._device.parameters) - 1 + 7) // 8)
+
+    def _nav(self, step):
+        self._bank_index = max(0, min(self._bank_count() - 1, self._bank_index + step))
+        self._update()
+
+    def _parameter_bank_names(self):
+        return ['Bank {}'.format(index + 1) for index in range(self._bank_count())]
+
+    def _update(self):
+        if self._device is None:
+            self._bank_name = ''
+            for control in self._parameter_controls:
+                control.release_parameter()
+            return
+        self._bank_name = 'Bank {}'.format(self._bank_index + 1)
+        parameters = self._device.parameters[1:]
+        for index, control in enumerate(self._parameter_controls):
+            parameter_index = self._bank_index * 8 + index
+            if parameter_index < len(parameters):
+                control.connect_to(parameters[parameter_index])
+            else:
+                control.release_parameter()
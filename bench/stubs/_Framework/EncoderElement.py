@@ -0,0 +1,11 @@
+# MicroPush
+
+from .InputControlElement import *
+from .SubjectSlot import subject_slot
+
+
+class EncoderElement(InputControlElement):
+
+    def __init__(self, msg_type, channel, identifier, map_mode, *a, **k):
+        InputControlElement.__init__(self, msg_type, channel, identifier)
+        self._map_mode = map_mode
@@ -0,0 +1,57 @@
+# MicroPush
+
+MIDI_NOTE_TYPE = 0
+MIDI_CC_TYPE = 1
+MIDI_PB_TYPE = 2
+MIDI_SYSEX_TYPE = 3
+MIDI_NOTE_ON_STATUS = 144
+MIDI_NOTE_OFF_STATUS = 128
+MIDI_CC_STATUS = 176
+
+# control elements created so far, read by the benchmarks
+instances_created = [0]
+
+
+class InputControlElement(object):
+
+    def __init__(self, msg_type, channel, identifier, *a, **k):
+        instances_created[0] += 1
+        self._msg_type = msg_type
+        self._msg_channel = channel
+        self._msg_identifier = identifier
+        self._value_listeners = []
+        self.name = ''
+
+    def message_type(self):
+        return self._msg_type
+
+    def message_channel(self):
+        return self._msg_channel
+
+    def message_identifier(self):
+        return self._msg_identifier
+
+    def add_value_listener(self, callback, identify_sender=False):
+        self._value_listeners.append(callback)
+
+    def remove_value_listener(self, callback):
+        self._value_listeners.remove(callback)
+
+    def value_has_listener(self, callback):
+        return callback in self._value_listeners
+
+    def receive_value(self, value):
+        for callback in list(self._value_listeners):
+            callback(value)
+
+    def send_value(self, value, force=False):
+        pass
+
+    def mapped_parameter(self):
+        return getattr(self, '_mapped_parameter', None)
+
+    def connect_to(self, parameter):
+        self._mapped_parameter = parameter
+
+    def release_parameter(self):
+        self._mapped_parameter = None
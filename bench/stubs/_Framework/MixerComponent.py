@@ -0,0 +1,58 @@
+# MicroPush
+
+from .ControlSurfaceComponent import ControlSurfaceComponent
+from .ChannelStripComponent import ChannelStripComponent
+
+
+class MixerComponent(ControlSurfaceComponent):
+
+    def __init__(self, num_tracks=0, num_returns=0, *a, **k):
+        ControlSurfaceComponent.__init__(self)
+        self._track_offset = 0
+        self._channel_strips = []
+        self._return_strips = []
+        for index in range(num_tracks):
+            self._channel_strips.append(self._create_strip())
+            self.register_components(self._channel_strips[index])
+        for index in range(num_returns):
+            self._return_strips.append(self._create_strip())
+            self.register_components(self._return_strips[index])
+        self._master_strip = self._create_strip()
+        self.register_components(self._master_strip)
+        self._master_strip.set_track(self.song().master_track)
+        self._prehear_volume_control = None
+        self._reassign_tracks()
+
+    def _create_strip(self):
+        return ChannelStripComponent()
+
+    def channel_strip(self, index):
+        assert index in range(len(self._channel_strips))
+        return self._channel_strips[index]
+
+    def return_strip(self, index):
+        assert index in range(len(self._return_strips))
+        return self._return_strips[index]
+
+    def master_strip(self):
+        return self._master_strip
+
+    def set_prehear_volume_control(self, control):
+        self._prehear_volume_control = control
+
+    def set_track_offset(self, new_offset):
+        assert new_offset >= 0
+        self._track_offset = new_offset
+        self._reassign_tracks()
+
+    def tracks_to_use(self):
+        return self.song().visible_tracks
+
+    def _reassign_tracks(self):
+        tracks = self.tracks_to_use()
+        returns = self.song().return_tracks
+        for index, strip in enumerate(self._channel_strips):
+            track_index = self._track_offset + index
+            strip.set_track(tracks[track_index] if len(tracks) > track_index else None)
+        for index, strip in enumerate(self._return_strips):
+            strip.set_track(returns[index] if len(returns) > index else None)
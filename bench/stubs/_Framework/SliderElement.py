@@ -0,0 +1,7 @@
+# MicroPush
+
+from .InputControlElement import InputControlElement
+
+
+class SliderElement(InputControlElement):
+    pass
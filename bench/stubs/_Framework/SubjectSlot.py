@@ -0,0 +1,44 @@
+# MicroPush
+
+class SubjectSlot(object):
+
+    def __init__(self, event, function, owner):
+        self._event = event
+        self._function = function
+        self._owner = owner
+        self._subject = None
+
+    def _get_subject(self):
+        return self._subject
+
+    def _set_subject(self, subject):
+        if self._subject is not None:
+            getattr(self._subject, 'remove_' + self._event + '_listener')(self)
+        self._subject = subject
+        if subject is not None:
+            getattr(subject, 'add_' + self._event + '_listener')(self)
+
+    subject = property(_get_subject, _set_subject)
+
+    def __call__(self, *a, **k):
+        return self._function(self._owner, *a, **k)
+
+
+def subject_slot(event):
+
+    def decorator(function):
+        attribute = '_subject_slot_' + function.__name__
+
+        class SubjectSlotDescriptor(object):
+
+            def __get__(self, obj, cls=None):
+                if obj is None:
+                    return self
+                slot = obj.__dict__.get(attribute)
+                if slot is None:
+                    slot = obj.__dict__[attribute] = SubjectSlot(event, function, obj)
+                return slot
+
+        return SubjectSlotDescriptor()
+
+    return decorator
@@ -0,0 +1,15 @@
+# MicroPush
+
+from .ControlSurfaceComponent import ControlSurfaceComponent
+
+
+class TransportComponent(ControlSurfaceComponent):
+
+    def set_play_button(self, button):
+        self._play_button = button
+
+    def set_stop_button(self, button):
+        self._stop_button = button
+
+    def set_metronome_button(self, button):
+        self._metronome_button = button
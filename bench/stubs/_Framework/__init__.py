@@ -0,0 +1,2 @@
+# MicroPush
+# Stand-in for the _Framework classes the script uses, without any MIDI mapping.
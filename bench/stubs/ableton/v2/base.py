@@ -0,0 +1,18 @@
+# MicroPush
+# Stand-in for the parts of ableton.v2.base the script imports.
+
+
+def liveobj_valid(obj):
+    return obj is not None and bool(obj)
+
+
+def liveobj_changed(obj, other):
+    return obj != other
+
+
+def listens(event):
+
+    def decorator(function):
+        return function
+
+    return decorator